@@ -39,9 +39,26 @@ This competition is evaluated on the categorization accuracy of your predictions
 # pip install matplotlib
 # pip install kaggle
 
-from google.colab import files
+import os
+
+from mnist.dataset import load_dataset, normalize
+from mnist.early_stopping import EarlyStopping
+from mnist.network import get_accuracy, make_predictions
+from mnist.score import score_csv
+from mnist.serialize import save_model
+from mnist.sparse import sparsify
+from mnist.telemetry import Telemetry
+from mnist.train import gradient_descent
+
+
+def upload_kaggle_token():
+    """Open Colab's file picker for kaggle.json; does nothing outside Colab."""
+    try:
+        from google.colab import files
+    except ImportError:
+        return
+    files.upload()  # This will open a file uploader in your notebook.
 
-files.upload()  # This will open a file uploader in your notebook.
 
 # Create a kaggle folder
 # mkdir ~/.kaggle
@@ -92,32 +109,27 @@ ImageId,Label
 The evaluation metric for this contest is the categorization accuracy, or the proportion of test images that are correctly classified. For example, a categorization accuracy of 0.97 indicates that you have correctly classified all but 3% of the images.
 """
 
-import numpy as np
-import pandas as pd
-from matplotlib import pyplot as plt
-
-data = pd.read_csv("train.csv")
-
-data
+"""The first run parses `train.csv` once and writes a uint8 `train.npy` cache next to it (see `mnist/dataset.py`). Later runs memory-map that cache, so start-up takes milliseconds and the pixels stay as 1-byte integers until a batch is actually used."""
 
-data = np.array(data)
-m, n = data.shape
-np.random.shuffle(data)  # shuffle before splitting into dev and training sets
 
-data_dev = data[0:1000].T
-Y_dev = data_dev[0]
-X_dev = data_dev[1:n]
-X_dev = X_dev / 255.0
+def load_data(path="train.csv", sparse=False):
+    data = load_dataset(path)
+    m, n = data.shape
+    # The Kaggle rows are already in random order and mini-batch training
+    # reshuffles every epoch, so the split is contiguous and both halves stay
+    # zero-copy views of the cache.
+    data_dev = data[0:1000].T
+    Y_dev = data_dev[0]
+    X_dev = data_dev[1:n]
 
-data_train = data[1000:m].T
-Y_train = data_train[0]
-X_train = data_train[1:n]
-X_train = X_train / 255.0
-_, m_train = X_train.shape
+    data_train = data[1000:m].T
+    Y_train = data_train[0]
+    X_train = data_train[1:n]  # raw uint8, normalized batch by batch
+    if sparse:
+        # Scaled CSC matrix when the images are sparse enough to pay off.
+        X_train = sparsify(X_train)
+    return X_train, Y_train, X_dev, Y_dev
 
-X_dev
-
-X_train
 
 """## Neural Network
 
@@ -166,122 +178,94 @@ Backprop
 - $dZ^{[1]}$: 10 x m ($~A^{[1]}$)
 - $dW^{[1]}$: 10 x 10
 - $dB^{[1]}$: 10 x 1
-"""
-
-
-def init_params():
-    W1 = np.random.rand(10, 784) - 0.5
-    b1 = np.random.rand(10, 1) - 0.5
-    W2 = np.random.rand(10, 10) - 0.5
-    b2 = np.random.rand(10, 1) - 0.5
-    return W1, b1, W2, b2
 
+`softmax` comes from `mnist/losses.py`. It subtracts each column's maximum before exponentiating, which leaves the result unchanged but keeps large logits from overflowing, and reduces with a vectorized `np.sum(..., axis=0)`.
 
-def ReLU(Z):
-    return np.maximum(Z, 0)
-
-
-def softmax(Z):
-    A = np.exp(Z) / sum(np.exp(Z))
-    return A
-
+The functions themselves live in `mnist/network.py`, so a service can import `forward_prop` or `make_predictions` without running this script.
+"""
 
-def forward_prop(W1, b1, W2, b2, X):
-    Z1 = W1.dot(X) + b1
-    A1 = ReLU(Z1)
-    Z2 = W2.dot(A1) + b2
-    A2 = softmax(Z2)
-    return Z1, A1, Z2, A2
+"""## Training the Model
 
+The `gradient_descent` function is likely responsible for implementing the gradient descent optimization algorithm. Gradient descent is a common optimization technique used to update the model's parameters in such a way that it minimizes the error between the model's predictions and the actual target values. It does this by calculating the gradient of a cost or loss function with respect to the model's parameters and updating them in the direction that reduces the loss.
 
-def ReLU_deriv(Z):
-    return Z > 0
+Running every step over all ~41,000 training images is slow, so `gradient_descent` also has a mini-batch mode. With `batch_size` set, each of the `iterations` becomes one epoch: the training loop in `mnist/train.py` reshuffles the column order and gathers each batch of `batch_size` columns straight from the training matrix, with a parameter update after every batch. Only one batch of activations is alive at a time, so memory stays flat as the training set grows. Leaving `batch_size` as `None` keeps the original full-batch behaviour.
 
+The functions above are the readable reference version of the network. `gradient_descent` (in `mnist/train.py`) trains an `MLP` from `mnist/mlp.py` instead: a layer-list model whose weights and biases are views into one flat float32 buffer. Every activation, gradient and the one-hot label matrix is allocated once and then reused through `out=` arguments and in-place updates, so a training step does not allocate any arrays after the first batch.
 
-def one_hot(Y):
-    one_hot_Y = np.zeros((Y.size, Y.max() + 1))
-    one_hot_Y[np.arange(Y.size), Y] = 1
-    one_hot_Y = one_hot_Y.T
-    return one_hot_Y
+By default it trains the same 784 → 10 → 10 network. A bigger (or smaller) network is one argument away, without touching the training loop:
 
+```python
+from mnist.mlp import MLP
 
-def backward_prop(Z1, A1, Z2, A2, W1, W2, X, Y):
-    one_hot_Y = one_hot(Y)
-    dZ2 = A2 - one_hot_Y
-    dW2 = 1 / m * dZ2.dot(A1.T)
-    db2 = 1 / m * np.sum(dZ2)
-    dZ1 = W2.T.dot(dZ2) * ReLU_deriv(Z1)
-    dW1 = 1 / m * dZ1.dot(X.T)
-    db1 = 1 / m * np.sum(dZ1)
-    return dW1, db1, dW2, db2
+model = gradient_descent(X_train, Y_train, 0.10, 20, batch_size=128, model=MLP((784, 128, 64, 10)))
+```
 
+The learning rate, batch size and number of epochs used below were picked by hand. `mnist/sweep.py` tries many of them at once: it trains one model per config in a process pool that shares the training matrix through shared memory, and returns a table of dev accuracy, final loss and training time.
 
-def update_params(W1, b1, W2, b2, dW1, db1, dW2, db2, alpha):
-    W1 = W1 - alpha * dW1
-    b1 = b1 - alpha * db1
-    W2 = W2 - alpha * dW2
-    b2 = b2 - alpha * db2
-    return W1, b1, W2, b2
+```python
+from mnist.sweep import grid, sweep
 
+configs = grid(alpha=[0.05, 0.1, 0.2], batch_size=[64, 128, 256], iterations=[10, 20])
+sweep(configs, X_train, Y_train, X_dev, Y_dev)
+```
+"""
 
-def get_predictions(A2):
-    return np.argmax(A2, 0)
 
+def train(X_train, Y_train, X_dev, Y_dev):
+    early_stopping = EarlyStopping(X_dev, Y_dev, patience=3)
+    with Telemetry(console=True, console_every=5) as telemetry:
+        return gradient_descent(
+            X_train,
+            Y_train,
+            0.10,
+            20,
+            batch_size=128,
+            telemetry=telemetry,
+            early_stopping=early_stopping,
+        )
 
-def get_accuracy(predictions, Y):
-    print(predictions, Y)
-    return np.sum(predictions == Y) / Y.size
 
+"""## Testing"""
 
-def gradient_descent(X, Y, alpha, iterations):
-    W1, b1, W2, b2 = init_params()
-    for i in range(iterations):
-        Z1, A1, Z2, A2 = forward_prop(W1, b1, W2, b2, X)
-        dW1, db1, dW2, db2 = backward_prop(Z1, A1, Z2, A2, W1, W2, X, Y)
-        W1, b1, W2, b2 = update_params(W1, b1, W2, b2, dW1, db1, dW2, db2, alpha)
-        if i % 10 == 0:
-            print("Iteration: ", i)
-            predictions = get_predictions(A2)
-            print(get_accuracy(predictions, Y))
-    return W1, b1, W2, b2
 
+def test_prediction(index, W1, b1, W2, b2, X, Y):
+    from matplotlib import pyplot as plt
 
-"""## Training the Model
+    current_image = X[:, index, None]
+    prediction = make_predictions(normalize(current_image), W1, b1, W2, b2)
+    label = Y[index]
+    print("Prediction: ", prediction)
+    print("Label: ", label)
 
-The `gradient_descent` function is likely responsible for implementing the gradient descent optimization algorithm. Gradient descent is a common optimization technique used to update the model's parameters in such a way that it minimizes the error between the model's predictions and the actual target values. It does this by calculating the gradient of a cost or loss function with respect to the model's parameters and updating them in the direction that reduces the loss.
-"""
+    current_image = current_image.reshape((28, 28))
+    plt.gray()
+    plt.imshow(current_image, interpolation="nearest")
+    plt.show()
 
-W1, b1, W2, b2 = gradient_descent(X_train, Y_train, 0.10, 500)
 
+"""`main` saves the trained network to `mnist_model.mlp` with `mnist.serialize.save_model`. Another process can then call `load_model("mnist_model.mlp")` and start predicting right away instead of retraining. The weights are memory-mapped read-only, so any number of inference workers share a single copy of them in the page cache.
 
-def make_predictions(X, W1, b1, W2, b2):
-    _, _, _, A2 = forward_prop(W1, b1, W2, b2, X)
-    predictions = get_predictions(A2)
-    return predictions
+If `test.csv` is present, `main` also writes the `ImageId,Label` submission file described above. `mnist.score.score_csv` reads the test set in fixed-size chunks and appends each chunk's predictions to `submission.csv` as it goes, so memory stays bounded however many rows the file has."""
 
 
-def test_prediction(index, W1, b1, W2, b2):
-    current_image = X_train[:, index, None]
-    prediction = make_predictions(X_train[:, index, None], W1, b1, W2, b2)
-    label = Y_train[index]
-    print("Prediction: ", prediction)
-    print("Label: ", label)
+def main():
+    upload_kaggle_token()
+    X_train, Y_train, X_dev, Y_dev = load_data("train.csv")
 
-    current_image = current_image.reshape((28, 28)) * 255
-    plt.gray()
-    plt.imshow(current_image, interpolation="nearest")
-    plt.show()
+    model = train(X_train, Y_train, X_dev, Y_dev)
+    save_model("mnist_model.mlp", model)
+    (W1, W2), (b1, b2) = model.weights, model.biases
 
+    for index in range(4):
+        test_prediction(index, W1, b1, W2, b2, X_train, Y_train)
 
-"""## Testing"""
+    dev_predictions = make_predictions(normalize(X_dev), W1, b1, W2, b2)
+    print(get_accuracy(dev_predictions, Y_dev))
 
-test_prediction(0, W1, b1, W2, b2)
-test_prediction(1, W1, b1, W2, b2)
-test_prediction(2, W1, b1, W2, b2)
-test_prediction(3, W1, b1, W2, b2)
+    if os.path.exists("test.csv"):
+        rows = score_csv(model, "test.csv", "submission.csv")
+        print("Wrote {} predictions to submission.csv".format(rows))
 
-dev_predictions = make_predictions(X_dev, W1, b1, W2, b2)
-get_accuracy(dev_predictions, Y_dev)
 
 """The Model is around 85% accurate.
 
@@ -307,3 +291,7 @@ Last but not least, we are thankful for the opportunity to learn and grow throug
 
 This journey wouldn't have been possible without the collective efforts of the entire community, and we are excited to see what the future holds for the field of machine learning and image recognition.
 """
+
+
+if __name__ == "__main__":
+    main()
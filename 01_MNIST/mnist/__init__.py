@@ -0,0 +1,11 @@
+"""Reusable pieces of the MNIST digit-recognizer notebook.
+
+Importing the package only loads NumPy and the inference code. pandas
+(CSV conversion, sweep tables) and matplotlib are imported lazily by the
+functions that need them, and nothing runs at import time.
+"""
+
+from .mlp import MLP
+from .network import forward_prop, get_predictions, make_predictions
+
+__all__ = ["MLP", "forward_prop", "get_predictions", "make_predictions"]
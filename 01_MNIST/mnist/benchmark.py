@@ -0,0 +1,282 @@
+"""Micro-benchmarks for the MNIST hot paths on synthetic data.
+
+Run from the ``01_MNIST`` directory::
+
+    python -m mnist.benchmark --save baseline.json
+    python -m mnist.benchmark --compare baseline.json
+
+Every function is timed for each batch size and dtype. The report gives
+throughput (samples/s), per-call latency percentiles and the peak memory
+NumPy allocates during one call, measured with ``tracemalloc``. ``--save``
+writes the results as JSON, and ``--compare`` reads such a file and flags
+every case whose throughput dropped by more than ``--tolerance``. It exits
+with status 1 if any did, so a nightly job can fail on a regression.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from . import network
+from .losses import softmax
+from .mlp import MLP, load_batch, one_hot
+from .sparse import sparsify
+
+# Fraction of nonzero pixels in the ``*_sparse`` cases, typical of scanned
+# forms; compare them with the dense cases of the same name.
+SPARSE_BENCH_DENSITY = 0.05
+
+
+def _inputs(batch_size, dtype, rng):
+    X = (rng.integers(0, 256, (784, batch_size)) / 255.0).astype(dtype)
+    Y = rng.integers(0, 10, batch_size)
+    return X, Y
+
+
+def _sparse_inputs(batch_size, dtype, rng):
+    X, Y = _inputs(batch_size, dtype, rng)
+    X *= rng.random(X.shape) < SPARSE_BENCH_DENSITY
+    return sparsify(X, threshold=1, dtype=dtype), Y
+
+
+def _reference_params(dtype):
+    return [p.astype(dtype) for p in network.init_params()]
+
+
+def _bench_softmax(batch_size, dtype, rng):
+    Z = rng.standard_normal((10, batch_size)).astype(dtype)
+    return lambda: softmax(Z)
+
+
+def _bench_one_hot(batch_size, dtype, rng):
+    _, Y = _inputs(batch_size, dtype, rng)
+    return lambda: network.one_hot(Y)
+
+
+def _bench_forward_prop(batch_size, dtype, rng):
+    X, _ = _inputs(batch_size, dtype, rng)
+    W1, b1, W2, b2 = _reference_params(dtype)
+    return lambda: network.forward_prop(W1, b1, W2, b2, X)
+
+
+def _bench_backward_prop(batch_size, dtype, rng):
+    X, Y = _inputs(batch_size, dtype, rng)
+    W1, b1, W2, b2 = _reference_params(dtype)
+    Z1, A1, Z2, A2 = network.forward_prop(W1, b1, W2, b2, X)
+    return lambda: network.backward_prop(Z1, A1, Z2, A2, W1, W2, X, Y)
+
+
+def _bench_forward_prop_sparse(batch_size, dtype, rng):
+    X, _ = _sparse_inputs(batch_size, dtype, rng)
+    W1, b1, W2, b2 = _reference_params(dtype)
+    return lambda: network.forward_prop(W1, b1, W2, b2, X)
+
+
+def _bench_backward_prop_sparse(batch_size, dtype, rng):
+    X, Y = _sparse_inputs(batch_size, dtype, rng)
+    W1, b1, W2, b2 = _reference_params(dtype)
+    Z1, A1, Z2, A2 = network.forward_prop(W1, b1, W2, b2, X)
+    return lambda: network.backward_prop(Z1, A1, Z2, A2, W1, W2, X, Y)
+
+
+def _bench_make_predictions(batch_size, dtype, rng):
+    X, _ = _inputs(batch_size, dtype, rng)
+    W1, b1, W2, b2 = _reference_params(dtype)
+    return lambda: network.make_predictions(X, W1, b1, W2, b2)
+
+
+def _bench_mlp_train_step(batch_size, dtype, rng, inputs=_inputs):
+    X, Y = inputs(batch_size, dtype, rng)
+    model = MLP((784, 10, 10), dtype=dtype)
+    ws = model.workspace(batch_size)
+    load_batch(ws, X, one_hot(Y, dtype=dtype))
+
+    def step():
+        model.forward_logits(ws)
+        model.backward(ws)
+
+    return step
+
+
+def _bench_mlp_train_step_sparse(batch_size, dtype, rng):
+    return _bench_mlp_train_step(batch_size, dtype, rng, _sparse_inputs)
+
+
+def _bench_mlp_predict(batch_size, dtype, rng):
+    X, _ = _inputs(batch_size, dtype, rng)
+    model = MLP((784, 10, 10), dtype=dtype)
+    return lambda: model.predict(X)
+
+
+BENCHMARKS = {
+    "softmax": _bench_softmax,
+    "one_hot": _bench_one_hot,
+    "forward_prop": _bench_forward_prop,
+    "backward_prop": _bench_backward_prop,
+    "forward_prop_sparse": _bench_forward_prop_sparse,
+    "backward_prop_sparse": _bench_backward_prop_sparse,
+    "make_predictions": _bench_make_predictions,
+    "mlp_train_step": _bench_mlp_train_step,
+    "mlp_train_step_sparse": _bench_mlp_train_step_sparse,
+    "mlp_predict": _bench_mlp_predict,
+}
+
+
+def measure(fn, batch_size, min_time=0.2, min_repeat=5, warmup=2):
+    """Time ``fn`` and return throughput, latency percentiles and peak memory."""
+    for _ in range(warmup):
+        fn()
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    latencies = []
+    deadline = time.perf_counter() + min_time
+    while len(latencies) < min_repeat or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    latencies = np.array(latencies)
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return {
+        "samples_per_s": batch_size * len(latencies) / latencies.sum(),
+        "p50_us": p50 * 1e6,
+        "p90_us": p90 * 1e6,
+        "p99_us": p99 * 1e6,
+        "peak_bytes": int(peak),
+        "calls": len(latencies),
+    }
+
+
+def run(
+    functions=None,
+    batch_sizes=(1, 128, 1024, 8192),
+    dtypes=("float32", "float64"),
+    min_time=0.2,
+    seed=0,
+):
+    """Benchmark every combination and return a list of result dicts."""
+    results = []
+    for name in functions or BENCHMARKS:
+        for dtype in dtypes:
+            for batch_size in batch_sizes:
+                rng = np.random.default_rng(seed)
+                fn = BENCHMARKS[name](batch_size, np.dtype(dtype), rng)
+                result = {"function": name, "dtype": dtype, "batch_size": batch_size}
+                result.update(measure(fn, batch_size, min_time))
+                results.append(result)
+    return results
+
+
+def _key(result):
+    return result["function"], result["dtype"], result["batch_size"]
+
+
+def compare(results, baseline, tolerance=0.1):
+    """Attach ``speedup`` vs ``baseline``; returns the cases slower than tolerance."""
+    previous = {_key(r): r for r in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get(_key(result))
+        if old is None:
+            continue
+        result["speedup"] = result["samples_per_s"] / old["samples_per_s"]
+        if result["speedup"] < 1 - tolerance:
+            regressions.append(result)
+    return regressions
+
+
+def format_table(results):
+    header = "{:<22} {:<8} {:>6} {:>14} {:>10} {:>10} {:>10} {:>11} {:>8}".format(
+        "function",
+        "dtype",
+        "batch",
+        "samples/s",
+        "p50 us",
+        "p90 us",
+        "p99 us",
+        "peak KiB",
+        "vs base",
+    )
+    lines = [header, "-" * len(header)]
+    for r in results:
+        speedup = "{:.2f}x".format(r["speedup"]) if "speedup" in r else ""
+        lines.append(
+            "{:<22} {:<8} {:>6} {:>14,.0f} {:>10.1f} {:>10.1f} {:>10.1f} {:>11.1f} {:>8}".format(
+                r["function"],
+                r["dtype"],
+                r["batch_size"],
+                r["samples_per_s"],
+                r["p50_us"],
+                r["p90_us"],
+                r["p99_us"],
+                r["peak_bytes"] / 1024,
+                speedup,
+            )
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--functions", nargs="+", choices=sorted(BENCHMARKS))
+    parser.add_argument(
+        "--batch-sizes", nargs="+", type=int, default=[1, 128, 1024, 8192]
+    )
+    parser.add_argument(
+        "--dtypes",
+        nargs="+",
+        default=["float32", "float64"],
+        choices=["float32", "float64"],
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="seconds to spend timing each case"
+    )
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON written by --save")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="allowed throughput drop before a case is flagged",
+    )
+    args = parser.parse_args(argv)
+
+    results = run(args.functions, args.batch_sizes, args.dtypes, args.min_time)
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+    print(format_table(results))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "numpy": np.__version__,
+                    "machine": platform.machine(),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+    if regressions:
+        print("\n{} case(s) slower than the baseline:".format(len(regressions)))
+        for r in regressions:
+            print("  {} {} batch={}: {:.2f}x".format(*_key(r), r["speedup"]))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Binary cache and batch streaming for the Kaggle digit-recognizer CSV files.
+
+Parsing ``train.csv`` with pandas takes seconds on every run and produces an
+int64 frame that the notebook then copied twice more (``np.array`` and
+``/ 255.0``). ``convert_csv`` pays the parse once and writes the raw pixels to
+a uint8 ``.npy`` file next to the CSV, plus a small JSON sidecar recording the
+source file's size and mtime and a SHA-256 of the cached bytes.
+``load_dataset`` memory-maps that cache read-only, so opening it is close to
+free and pages are only read when a batch touches them. Pixels stay uint8
+until ``normalize`` scales the batch that is actually being used.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+CACHE_VERSION = 1
+CHUNK_ROWS = 4096
+
+
+def cache_paths(csv_path):
+    base = os.path.splitext(csv_path)[0]
+    return base + ".npy", base + ".npy.json"
+
+
+def _count_rows(csv_path):
+    newlines = 0
+    last = b"\n"
+    with open(csv_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            newlines += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        newlines += 1  # final row without a trailing newline
+    return newlines - 1  # header
+
+
+def _sha256(data, chunk_rows=CHUNK_ROWS):
+    digest = hashlib.sha256()
+    for start in range(0, data.shape[0], chunk_rows):
+        digest.update(np.ascontiguousarray(data[start : start + chunk_rows]))
+    return digest.hexdigest()
+
+
+def convert_csv(csv_path, chunk_rows=CHUNK_ROWS):
+    """Parse ``csv_path`` once and write its uint8 cache; returns the cache path."""
+    import pandas as pd  # only needed for the one-time conversion
+
+    cache_path, meta_path = cache_paths(csv_path)
+    tmp_path = cache_path + ".tmp.npy"
+    stat = os.stat(csv_path)
+    rows = _count_rows(csv_path)
+
+    out = None
+    columns = None
+    digest = hashlib.sha256()
+    pos = 0
+    for chunk in pd.read_csv(csv_path, dtype=np.uint8, chunksize=chunk_rows):
+        block = chunk.to_numpy()
+        if out is None:
+            columns = list(chunk.columns)
+            out = np.lib.format.open_memmap(
+                tmp_path, mode="w+", dtype=np.uint8, shape=(rows, block.shape[1])
+            )
+        out[pos : pos + len(block)] = block
+        digest.update(out[pos : pos + len(block)])
+        pos += len(block)
+    if out is None or pos != rows:
+        raise ValueError(
+            "{}: expected {} data rows, parsed {}".format(csv_path, rows, pos)
+        )
+    out.flush()
+    del out
+    os.replace(tmp_path, cache_path)
+
+    meta = {
+        "version": CACHE_VERSION,
+        "source": os.path.basename(csv_path),
+        "source_size": stat.st_size,
+        "source_mtime": stat.st_mtime,
+        "shape": [rows, len(columns)],
+        "columns": columns,
+        "sha256": digest.hexdigest(),
+    }
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    return cache_path
+
+
+def _is_fresh(csv_path, meta_path):
+    if not os.path.exists(meta_path):
+        return False
+    if not os.path.exists(csv_path):
+        return True  # cache shipped without its source
+    with open(meta_path) as f:
+        meta = json.load(f)
+    stat = os.stat(csv_path)
+    return (
+        meta.get("version") == CACHE_VERSION
+        and meta["source_size"] == stat.st_size
+        and meta["source_mtime"] == stat.st_mtime
+    )
+
+
+def load_cache(cache_path, verify=False):
+    """Memory-map a cache written by ``convert_csv``; returns ``(data, meta)``."""
+    with open(cache_path + ".json") as f:
+        meta = json.load(f)
+    data = np.load(cache_path, mmap_mode="r")
+    if list(data.shape) != meta["shape"]:
+        raise ValueError(
+            "{}: shape {} does not match metadata {}".format(
+                cache_path, data.shape, meta["shape"]
+            )
+        )
+    if verify and _sha256(data) != meta["sha256"]:
+        raise ValueError("{}: checksum mismatch".format(cache_path))
+    return data, meta
+
+
+def load_dataset(csv_path, verify=False):
+    """Return the rows of ``csv_path`` as a read-only uint8 memmap.
+
+    The cache is (re)built whenever it is missing or the CSV has changed since
+    it was written. ``verify`` re-hashes the cached bytes, which costs a full
+    read of the file.
+    """
+    cache_path, meta_path = cache_paths(csv_path)
+    if not _is_fresh(csv_path, meta_path):
+        convert_csv(csv_path)
+    data, _ = load_cache(cache_path, verify)
+    return data
+
+
+def normalize(X, dtype=np.float64):
+    """Scale raw 0-255 pixels to [0, 1]; already-scaled float input is returned as is."""
+    if X.dtype != np.uint8:
+        return X
+    return np.multiply(X, 1 / 255.0, dtype=dtype)
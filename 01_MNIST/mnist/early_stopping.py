@@ -0,0 +1,92 @@
+"""Early stopping on dev-set accuracy for ``gradient_descent``.
+
+``EarlyStopping`` scores the dev set every ``every`` iterations. If accuracy
+has not improved by at least ``min_delta`` for ``patience`` evaluations in a
+row, training stops and the parameters from the best evaluation are copied
+back into the model.
+
+Evaluations are cheap: the dev pixels are normalized into inference
+workspaces once, on the first evaluation. After that a check is just a
+forward pass over those buffers, with no data copies and no allocations, and
+the best parameters are saved with one ``np.copyto`` into a preallocated
+buffer. ``subsample`` scores a fixed random subset of the dev set instead of
+all of it, which keeps evaluations on large dev sets in proportion.
+"""
+
+import numpy as np
+
+from .mlp import load_batch
+
+
+class EarlyStopping:
+    def __init__(
+        self,
+        X_dev,
+        Y_dev,
+        patience=5,
+        min_delta=1e-3,
+        every=1,
+        subsample=None,
+        batch_size=4096,
+        seed=0,
+    ):
+        if subsample is not None and subsample < Y_dev.size:
+            idx = np.sort(
+                np.random.default_rng(seed).choice(Y_dev.size, subsample, replace=False)
+            )
+            X_dev, Y_dev = X_dev[:, idx], Y_dev[idx]
+        self.X_dev = X_dev
+        self.Y_dev = np.asarray(Y_dev)
+        self.patience = patience
+        self.min_delta = min_delta
+        self.every = every
+        self.batch_size = batch_size
+        self.best_accuracy = -np.inf
+        self.best_iteration = None
+        self.last_accuracy = None
+        self.wait = 0
+        self._chunks = None
+        self._best_params = None
+
+    def _bind(self, model):
+        self._chunks = []
+        for start in range(0, self.Y_dev.size, self.batch_size):
+            stop = min(start + self.batch_size, self.Y_dev.size)
+            ws = model.workspace(stop - start)
+            load_batch(ws, self.X_dev[:, start:stop])
+            labels = self.Y_dev[start:stop]
+            predictions = np.empty(stop - start, np.intp)
+            matches = np.empty(stop - start, bool)
+            self._chunks.append((ws, labels, predictions, matches))
+        self._best_params = np.empty_like(model.params)
+
+    def evaluate(self, model):
+        """Return the model's accuracy on the (possibly subsampled) dev set."""
+        if self._chunks is None:
+            self._bind(model)
+        correct = 0
+        for ws, labels, predictions, matches in self._chunks:
+            np.argmax(model.forward_logits(ws), 0, out=predictions)
+            np.equal(predictions, labels, out=matches)
+            correct += np.count_nonzero(matches)
+        return correct / self.Y_dev.size
+
+    def update(self, model, iteration):
+        """Score the model if due; returns True when training should stop."""
+        if iteration % self.every:
+            self.last_accuracy = None
+            return False
+        accuracy = self.last_accuracy = self.evaluate(model)
+        if accuracy > self.best_accuracy + self.min_delta:
+            self.best_accuracy = accuracy
+            self.best_iteration = iteration
+            self.wait = 0
+            np.copyto(self._best_params, model.params)
+            return False
+        self.wait += 1
+        return self.wait >= self.patience
+
+    def restore(self, model):
+        """Copy the best parameters seen so far back into ``model``."""
+        if self._best_params is not None:
+            np.copyto(model.params, self._best_params)
@@ -0,0 +1,46 @@
+"""Softmax and the fused softmax/cross-entropy kernel.
+
+Both work column-wise (one column per sample) and subtract each column's
+maximum before exponentiating, so large logits cannot overflow. The
+reductions are axis-wise NumPy sums rather than Python's builtin ``sum``,
+and ``exp`` is evaluated once per element.
+"""
+
+import numpy as np
+
+
+def softmax(Z, out=None, col=None):
+    """Return ``softmax(Z)`` per column, written into ``out`` when given.
+
+    ``col`` is an optional ``1 x m`` scratch row for the column reductions.
+    """
+    if out is None:
+        out = np.empty_like(Z)
+    if col is None:
+        col = np.empty((1, Z.shape[1]), Z.dtype)
+    np.max(Z, axis=0, keepdims=True, out=col)
+    np.subtract(Z, col, out=out)
+    np.exp(out, out=out)
+    np.sum(out, axis=0, keepdims=True, out=col)
+    out /= col
+    return out
+
+
+def softmax_cross_entropy(Z, one_hot_Y, A, dZ, col):
+    """Fused softmax + mean cross-entropy for logits ``Z``.
+
+    Writes the probabilities into ``A`` and the logit gradient ``A - Y`` into
+    ``dZ`` (the ``1/m`` factor is applied to the weight gradients, as in the
+    notebook) and returns the mean loss. The loss uses the log-sum-exp form
+    ``log(sum(exp(Z - max))) - (Z - max)[label]``, so it never takes the log
+    of a probability that has underflowed to zero.
+    """
+    np.max(Z, axis=0, keepdims=True, out=col)
+    np.subtract(Z, col, out=A)
+    picked = np.vdot(one_hot_Y, A)  # sum of the shifted logits at the labels
+    np.exp(A, out=A)
+    np.sum(A, axis=0, keepdims=True, out=col)
+    A /= col
+    np.subtract(A, one_hot_Y, out=dZ)
+    np.log(col, out=col)
+    return float(col.sum() - picked) / Z.shape[1]
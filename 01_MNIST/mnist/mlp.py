@@ -0,0 +1,241 @@
+"""Layer-list multilayer perceptron built on preallocated float32 workspaces.
+
+``MLP((784, 10, 10))`` is the notebook's network; any list of widths works,
+e.g. ``MLP((784, 128, 64, 10), activations=("relu", "tanh"))``. All weights
+and biases live in one contiguous ``params`` vector and ``weights``/``biases``
+are views into it. ``grads`` has the same layout, so an update is a single
+vectorized operation over the whole model.
+
+Forward and backward passes write every intermediate into a ``Workspace``
+allocated once per batch width, through ``out=`` arguments, so a training
+step allocates no arrays after the first batch. Bias gradients are summed per
+unit (``axis=1``), as the $dB = \\frac{1}{m} \\Sigma dZ$ formulas describe.
+"""
+
+import numpy as np
+
+from .losses import softmax, softmax_cross_entropy
+from .sparse import input_dot, input_grad, issparse
+
+
+def _relu(Z, out):
+    np.maximum(Z, 0, out=out)
+
+
+def _relu_grad(Z, A, dZ, scratch):
+    np.greater(Z, 0, out=scratch)
+    dZ *= scratch
+
+
+def _tanh(Z, out):
+    np.tanh(Z, out=out)
+
+
+def _tanh_grad(Z, A, dZ, scratch):
+    np.multiply(A, A, out=scratch)
+    np.subtract(1, scratch, out=scratch)
+    dZ *= scratch
+
+
+def _sigmoid(Z, out):
+    np.negative(Z, out=out)
+    np.exp(out, out=out)
+    out += 1
+    np.reciprocal(out, out=out)
+
+
+def _sigmoid_grad(Z, A, dZ, scratch):
+    np.subtract(1, A, out=scratch)
+    scratch *= A
+    dZ *= scratch
+
+
+# Hidden-layer activations as (forward, in-place derivative) pairs. The output
+# layer is always softmax, paired with cross-entropy in ``backward``.
+ACTIVATIONS = {
+    "relu": (_relu, _relu_grad),
+    "tanh": (_tanh, _tanh_grad),
+    "sigmoid": (_sigmoid, _sigmoid_grad),
+}
+
+
+class Workspace:
+    """Activation and scratch buffers for batches of exactly ``batch_size`` columns."""
+
+    def __init__(self, model, batch_size):
+        dtype = model.dtype
+        widths = model.sizes[1:]
+        self.batch_size = batch_size
+        self.X = np.empty((model.sizes[0], batch_size), dtype)
+        self.Y = np.empty((model.sizes[-1], batch_size), dtype)
+        self.Z = [np.empty((n, batch_size), dtype) for n in widths]
+        self.A = [np.empty((n, batch_size), dtype) for n in widths]
+        self.dZ = [np.empty((n, batch_size), dtype) for n in widths]
+        self.scratch = [np.empty((n, batch_size), dtype) for n in widths[:-1]]
+        self.col = np.empty((1, batch_size), dtype)
+
+
+class MLP:
+    """Fully connected network ``sizes[0] -> ... -> sizes[-1]`` with a softmax output.
+
+    ``activations`` names one activation per hidden layer (default ReLU).
+    ``params`` may be an existing flat buffer of the right size and dtype, in
+    which case the model uses it as is instead of initializing new weights.
+    """
+
+    def __init__(
+        self, sizes=(784, 10, 10), activations=None, dtype=np.float32, params=None
+    ):
+        sizes = tuple(int(n) for n in sizes)
+        if len(sizes) < 2:
+            raise ValueError("an MLP needs at least input and output sizes")
+        if activations is None:
+            activations = ("relu",) * (len(sizes) - 2)
+        activations = tuple(activations)
+        if len(activations) != len(sizes) - 2:
+            raise ValueError(
+                "expected {} hidden activations, got {}".format(
+                    len(sizes) - 2, len(activations)
+                )
+            )
+        for name in activations:
+            if name not in ACTIVATIONS:
+                raise ValueError("unknown activation {!r}".format(name))
+        self.sizes = sizes
+        self.activations = activations
+        self.dtype = np.dtype(dtype)
+
+        size = sum(n_out * (n_in + 1) for n_in, n_out in zip(sizes[:-1], sizes[1:]))
+        if params is None:
+            params = np.empty(size, self.dtype)
+            self.params = params
+            self.weights, self.biases = self._views(params)
+            self.init_params()
+        else:
+            if params.shape != (size,) or params.dtype != self.dtype:
+                raise ValueError(
+                    "params must be a flat {} buffer of {} values".format(
+                        self.dtype, size
+                    )
+                )
+            self.params = params
+            self.weights, self.biases = self._views(params)
+        self._grads = None
+
+    @property
+    def grads(self):
+        # Allocated on first use so inference-only models (e.g. memory-mapped
+        # by ``mnist.serialize.load_model``) carry no gradient buffer.
+        if self._grads is None:
+            self._grads = np.zeros(self.params.size, self.dtype)
+            self._weight_grads, self._bias_grads = self._views(self._grads)
+        return self._grads
+
+    @property
+    def weight_grads(self):
+        self.grads
+        return self._weight_grads
+
+    @property
+    def bias_grads(self):
+        self.grads
+        return self._bias_grads
+
+    def _views(self, flat):
+        weights, biases = [], []
+        pos = 0
+        for n_in, n_out in zip(self.sizes[:-1], self.sizes[1:]):
+            weights.append(flat[pos : pos + n_out * n_in].reshape(n_out, n_in))
+            pos += n_out * n_in
+            biases.append(flat[pos : pos + n_out].reshape(n_out, 1))
+            pos += n_out
+        return weights, biases
+
+    def init_params(self):
+        """He-uniform weights and zero biases, so deeper stacks stay well scaled."""
+        for W, b in zip(self.weights, self.biases):
+            limit = np.sqrt(6.0 / W.shape[1])
+            W[...] = np.random.uniform(-limit, limit, W.shape)
+            b[...] = 0
+
+    def workspace(self, batch_size):
+        return Workspace(self, batch_size)
+
+    def forward_logits(self, ws):
+        A = ws.X
+        last = len(self.weights) - 1
+        for l, (W, b) in enumerate(zip(self.weights, self.biases)):
+            if l == 0 and issparse(A):
+                input_dot(W, A, out=ws.Z[0])
+            else:
+                np.dot(W, A, out=ws.Z[l])
+            ws.Z[l] += b
+            if l < last:
+                ACTIVATIONS[self.activations[l]][0](ws.Z[l], ws.A[l])
+                A = ws.A[l]
+        return ws.Z[-1]
+
+    def forward(self, ws):
+        self.forward_logits(ws)
+        return softmax(ws.Z[-1], out=ws.A[-1], col=ws.col)
+
+    def backward(self, ws):
+        """Fill ``grads`` from the logits left by ``forward_logits``; returns the loss.
+
+        The output softmax is evaluated here together with the cross-entropy
+        gradient, so a training step only needs ``forward_logits``;
+        ``ws.A[-1]`` still holds the probabilities afterwards.
+        """
+        loss = softmax_cross_entropy(ws.Z[-1], ws.Y, ws.A[-1], ws.dZ[-1], ws.col)
+        grads = self.grads
+        for l in range(len(self.weights) - 1, -1, -1):
+            A_prev = ws.X if l == 0 else ws.A[l - 1]
+            if l == 0 and issparse(A_prev):
+                input_grad(ws.dZ[0], A_prev, out=self.weight_grads[0])
+            else:
+                np.dot(ws.dZ[l], A_prev.T, out=self.weight_grads[l])
+            np.sum(ws.dZ[l], axis=1, keepdims=True, out=self.bias_grads[l])
+            if l > 0:
+                np.dot(self.weights[l].T, ws.dZ[l], out=ws.dZ[l - 1])
+                grad = ACTIVATIONS[self.activations[l - 1]][1]
+                grad(ws.Z[l - 1], ws.A[l - 1], ws.dZ[l - 1], ws.scratch[l - 1])
+        grads *= self.dtype.type(1 / ws.batch_size)
+        return loss
+
+    def predict(self, X):
+        """Return the predicted class of every column of ``X`` (raw uint8 or scaled)."""
+        ws = self.workspace(X.shape[1])
+        load_batch(ws, X)
+        self.forward_logits(ws)
+        return np.argmax(ws.Z[-1], 0)
+
+
+def one_hot(Y, num_classes=10, dtype=np.float32):
+    """Return the ``num_classes x m`` one-hot matrix, built once per dataset."""
+    one_hot_Y = np.zeros((num_classes, Y.size), dtype)
+    one_hot_Y[Y, np.arange(Y.size)] = 1
+    return one_hot_Y
+
+
+def load_batch(ws, X, one_hot_Y=None, idx=None):
+    """Copy columns ``idx`` (default: all) of ``X`` and ``one_hot_Y`` into ``ws``.
+
+    Raw uint8 pixels are scaled straight into ``ws.X``, so no float copy of the
+    dataset is ever made. ``X`` is gathered with fancy indexing rather than
+    ``np.take(..., out=)`` because ``np.take`` first copies a non-contiguous
+    source such as the transposed cache view; the only temporary is one uint8
+    batch. A sparse ``X`` from ``mnist.sparse.sparsify`` is already scaled;
+    its batch replaces ``ws.X`` instead of being densified.
+    """
+    batch = X if idx is None else X[:, idx]
+    if issparse(batch):
+        ws.X = batch.astype(ws.Y.dtype, copy=False)
+    elif X.dtype == np.uint8:
+        np.multiply(batch, ws.X.dtype.type(1 / 255.0), out=ws.X)
+    else:
+        ws.X[...] = batch
+    if one_hot_Y is not None:
+        if idx is None:
+            ws.Y[...] = one_hot_Y
+        else:
+            np.take(one_hot_Y, idx, axis=1, out=ws.Y)
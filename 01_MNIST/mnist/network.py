@@ -0,0 +1,79 @@
+"""Reference NumPy implementation of the notebook's 784-10-10 network.
+
+These are the functions the notebook walks through in its "Neural Network"
+section, kept as plain allocating code that mirrors the formulas one line at
+a time. ``mnist.mlp`` has the generalized, allocation-free version used for
+training.
+"""
+
+import numpy as np
+
+from .losses import softmax
+from .sparse import input_dot, input_grad, issparse
+
+
+def init_params():
+    W1 = np.random.rand(10, 784) - 0.5
+    b1 = np.random.rand(10, 1) - 0.5
+    W2 = np.random.rand(10, 10) - 0.5
+    b2 = np.random.rand(10, 1) - 0.5
+    return W1, b1, W2, b2
+
+
+def ReLU(Z):
+    return np.maximum(Z, 0)
+
+
+def forward_prop(W1, b1, W2, b2, X):
+    Z1 = (input_dot(W1, X) if issparse(X) else W1.dot(X)) + b1
+    A1 = ReLU(Z1)
+    Z2 = W2.dot(A1) + b2
+    A2 = softmax(Z2)
+    return Z1, A1, Z2, A2
+
+
+def ReLU_deriv(Z):
+    return Z > 0
+
+
+def one_hot(Y, num_classes=10):
+    # A fixed class count keeps the shape stable for mini-batches that happen
+    # to be missing the highest digit.
+    one_hot_Y = np.zeros((Y.size, num_classes))
+    one_hot_Y[np.arange(Y.size), Y] = 1
+    one_hot_Y = one_hot_Y.T
+    return one_hot_Y
+
+
+def backward_prop(Z1, A1, Z2, A2, W1, W2, X, Y):
+    m = Y.size  # size of the current batch, not of the whole training set
+    one_hot_Y = one_hot(Y)
+    dZ2 = A2 - one_hot_Y
+    dW2 = 1 / m * dZ2.dot(A1.T)
+    db2 = 1 / m * np.sum(dZ2)
+    dZ1 = W2.T.dot(dZ2) * ReLU_deriv(Z1)
+    dW1 = 1 / m * (input_grad(dZ1, X) if issparse(X) else dZ1.dot(X.T))
+    db1 = 1 / m * np.sum(dZ1)
+    return dW1, db1, dW2, db2
+
+
+def update_params(W1, b1, W2, b2, dW1, db1, dW2, db2, alpha):
+    W1 = W1 - alpha * dW1
+    b1 = b1 - alpha * db1
+    W2 = W2 - alpha * dW2
+    b2 = b2 - alpha * db2
+    return W1, b1, W2, b2
+
+
+def get_predictions(A2):
+    return np.argmax(A2, 0)
+
+
+def get_accuracy(predictions, Y):
+    return np.sum(predictions == Y) / Y.size
+
+
+def make_predictions(X, W1, b1, W2, b2):
+    _, _, _, A2 = forward_prop(W1, b1, W2, b2, X)
+    predictions = get_predictions(A2)
+    return predictions
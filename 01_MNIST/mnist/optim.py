@@ -0,0 +1,139 @@
+"""Optimizers and learning-rate schedules for ``gradient_descent``.
+
+An optimizer updates the model's flat ``params`` vector in place from the
+matching flat ``grads`` vector, so each update is a handful of vectorized
+operations over the whole network. State buffers (velocity, squared-gradient
+averages) are allocated on the first step and reused afterwards. ``grads`` is
+used as scratch and holds garbage after a step.
+
+``lr`` may be a number or a schedule: any callable mapping the update count
+(starting at 0) to a learning rate, such as the ones defined below.
+"""
+
+import math
+
+import numpy as np
+
+
+def constant(lr):
+    return lambda step: lr
+
+
+def step_decay(lr, drop=0.5, every=1000):
+    """Multiply ``lr`` by ``drop`` every ``every`` updates."""
+    return lambda step: lr * drop ** (step // every)
+
+
+def exponential_decay(lr, rate=0.96, decay_steps=1000):
+    return lambda step: lr * rate ** (step / decay_steps)
+
+
+def cosine_decay(lr, total_steps, min_lr=0.0):
+    """Anneal from ``lr`` to ``min_lr`` over ``total_steps`` updates, then hold."""
+
+    def schedule(step):
+        progress = min(step, total_steps) / total_steps
+        return min_lr + 0.5 * (lr - min_lr) * (1 + math.cos(math.pi * progress))
+
+    return schedule
+
+
+class Optimizer:
+    def __init__(self, lr):
+        self.lr = lr if callable(lr) else constant(lr)
+        self.steps = 0
+
+    def step(self, params, grads):
+        lr = self.lr(self.steps)
+        self._update(params, grads, lr)
+        self.steps += 1
+
+    def _update(self, params, grads, lr):
+        raise NotImplementedError
+
+
+class SGD(Optimizer):
+    """Plain gradient descent: ``param -= lr * grad``."""
+
+    def _update(self, params, grads, lr):
+        grads *= lr
+        params -= grads
+
+
+class Momentum(Optimizer):
+    """Heavy-ball momentum: ``v = beta * v + grad; param -= lr * v``."""
+
+    def __init__(self, lr=0.1, beta=0.9):
+        super().__init__(lr)
+        self.beta = beta
+        self.velocity = None
+
+    def _update(self, params, grads, lr):
+        if self.velocity is None:
+            self.velocity = np.zeros_like(params)
+        self.velocity *= self.beta
+        self.velocity += grads
+        np.multiply(self.velocity, lr, out=grads)
+        params -= grads
+
+
+class RMSProp(Optimizer):
+    """Scale each step by a running RMS of the gradient."""
+
+    def __init__(self, lr=0.001, rho=0.9, eps=1e-8):
+        super().__init__(lr)
+        self.rho = rho
+        self.eps = eps
+        self.square_avg = None
+        self._scratch = None
+
+    def _update(self, params, grads, lr):
+        if self.square_avg is None:
+            self.square_avg = np.zeros_like(params)
+            self._scratch = np.empty_like(params)
+        tmp = self._scratch
+        self.square_avg *= self.rho
+        np.multiply(grads, grads, out=tmp)
+        tmp *= 1 - self.rho
+        self.square_avg += tmp
+        np.sqrt(self.square_avg, out=tmp)
+        tmp += self.eps
+        grads /= tmp
+        grads *= lr
+        params -= grads
+
+
+class Adam(Optimizer):
+    """Adam with bias correction folded into the step size."""
+
+    def __init__(self, lr=0.001, beta1=0.9, beta2=0.999, eps=1e-8):
+        super().__init__(lr)
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.eps = eps
+        self.m = None
+        self.v = None
+        self._scratch = None
+
+    def _update(self, params, grads, lr):
+        if self.m is None:
+            self.m = np.zeros_like(params)
+            self.v = np.zeros_like(params)
+            self._scratch = np.empty_like(params)
+        tmp = self._scratch
+        t = self.steps + 1
+        step_size = lr * math.sqrt(1 - self.beta2**t) / (1 - self.beta1**t)
+
+        self.m *= self.beta1
+        np.multiply(grads, 1 - self.beta1, out=tmp)
+        self.m += tmp
+        self.v *= self.beta2
+        np.multiply(grads, grads, out=tmp)
+        tmp *= 1 - self.beta2
+        self.v += tmp
+
+        np.sqrt(self.v, out=tmp)
+        tmp += self.eps
+        np.divide(self.m, tmp, out=tmp)
+        tmp *= step_size
+        params -= tmp
@@ -0,0 +1,228 @@
+"""Data-parallel training across worker processes.
+
+The training images, labels and the model's flat parameter vector are placed
+in shared memory once. Each worker owns a contiguous shard of the images and
+runs the same ``forward_logits``/``backward`` as ``gradient_descent`` on its
+part of every step. It writes its averaged gradient into its own row of a
+shared ``workers x params`` block. The parent then all-reduces that block
+with one matrix-vector product, weighting each row by the worker's share of
+the step's samples. That is exactly the ``1/m`` average the single-process
+loop takes over the whole batch. The parent applies the optimizer to the
+shared parameters, which the workers read directly on the next step.
+
+Steps are synchronized with two barriers, so nothing but a few integers
+crosses process boundaries per step. In mini-batch mode each worker draws
+``batch_size / workers`` samples per step from its own reshuffled shard. In
+full-batch mode every step covers every sample, as in ``gradient_descent``.
+
+Like sweeps, this scales best with one BLAS thread per worker
+(``OMP_NUM_THREADS=1``).
+"""
+
+import math
+import multiprocessing
+import os
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .mlp import MLP, load_batch, one_hot
+from .optim import SGD
+
+_RUN, _STOP = 1, 0
+
+
+def _create(shape, dtype):
+    dtype = np.dtype(dtype)
+    size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    return shm, np.ndarray(shape, dtype, buffer=shm.buf)
+
+
+def _attach(spec):
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype, buffer=shm.buf)
+
+
+def _worker(
+    rank, specs, lo, hi, sizes, activations, local_batch, shuffle, seed, barriers
+):
+    start, done = barriers
+    blocks = {key: _attach(spec) for key, spec in specs.items()}
+    try:
+        arrays = {key: array for key, (_, array) in blocks.items()}
+        X = arrays["X"][lo:hi].T
+        Y = arrays["Y"][lo:hi]
+        control = arrays["control"]
+        model = MLP(sizes, activations, arrays["params"].dtype, params=arrays["params"])
+        one_hot_Y = one_hot(Y, sizes[-1], model.dtype)
+        m = hi - lo
+        full_batch = local_batch >= m
+        order = np.arange(m)
+        rng = np.random.default_rng([seed, rank])
+        workspaces = {}
+        while True:
+            start.wait()
+            if control[0] == _STOP:
+                break
+            step = control[2]
+            if step == 0 and shuffle and not full_batch:
+                rng.shuffle(order)
+            idx = (
+                order
+                if full_batch
+                else order[step * local_batch : (step + 1) * local_batch]
+            )
+            arrays["counts"][rank] = idx.size
+            if idx.size == 0:
+                arrays["losses"][rank] = 0.0
+                arrays["grads"][rank] = 0
+            else:
+                ws = workspaces.get(idx.size)
+                if ws is None:
+                    ws = workspaces[idx.size] = model.workspace(idx.size)
+                    load_batch(ws, X, one_hot_Y, idx)
+                elif not full_batch:
+                    load_batch(ws, X, one_hot_Y, idx)
+                model.forward_logits(ws)
+                arrays["losses"][rank] = model.backward(ws)
+                np.copyto(arrays["grads"][rank], model.grads)
+            done.wait()
+    except threading.BrokenBarrierError:
+        pass
+    except BaseException:
+        start.abort()
+        done.abort()
+        raise
+    finally:
+        for shm, _ in blocks.values():
+            shm.close()
+
+
+def parallel_gradient_descent(
+    X,
+    Y,
+    alpha,
+    iterations,
+    batch_size=None,
+    workers=None,
+    shuffle=True,
+    dtype=np.float32,
+    losses=None,
+    model=None,
+    optimizer=None,
+    verbose=False,
+    seed=0,
+    timeout=600,
+):
+    """Data-parallel version of ``mnist.train.gradient_descent``.
+
+    Arguments mean the same as there. ``batch_size`` is the global batch,
+    split evenly across ``workers`` processes (default: ``os.cpu_count()``).
+    ``timeout`` bounds how long any step may take before the run is
+    abandoned. Returns the trained model with a private copy of its
+    parameters.
+    """
+    if model is None:
+        model = MLP((X.shape[0], 10, 10), dtype=dtype)
+    if optimizer is None:
+        optimizer = SGD(alpha)
+    m = Y.size
+    workers = min(workers or os.cpu_count() or 1, m)
+    full_batch = batch_size is None or batch_size >= m
+    bounds = np.linspace(0, m, workers + 1).astype(int)
+    if full_batch:
+        local_batch = m
+        steps_per_epoch = 1
+    else:
+        local_batch = max(batch_size // workers, 1)
+        steps_per_epoch = math.ceil(np.diff(bounds).max() / local_batch)
+
+    blocks = []
+    specs = {}
+
+    def share(key, shape, dtype):
+        shm, array = _create(shape, dtype)
+        blocks.append(shm)
+        specs[key] = (shm.name, array.shape, array.dtype.str)
+        return array
+
+    processes = []
+    barriers = None
+    finished = False
+    try:
+        share("X", (m, X.shape[0]), X.dtype)[...] = X.T
+        share("Y", (m,), Y.dtype)[...] = Y
+        params = share("params", model.params.shape, model.dtype)
+        params[...] = model.params
+        slots = share("grads", (workers, model.params.size), model.dtype)
+        step_losses = share("losses", (workers,), np.float64)
+        counts = share("counts", (workers,), np.int64)
+        control = share("control", (3,), np.int64)
+        control[0] = _RUN
+
+        ctx = multiprocessing.get_context()
+        barriers = (
+            ctx.Barrier(workers + 1, timeout=timeout),
+            ctx.Barrier(workers + 1, timeout=timeout),
+        )
+        start, done = barriers
+        for rank in range(workers):
+            process = ctx.Process(
+                target=_worker,
+                args=(
+                    rank,
+                    specs,
+                    bounds[rank],
+                    bounds[rank + 1],
+                    model.sizes,
+                    model.activations,
+                    local_batch,
+                    shuffle,
+                    seed,
+                    barriers,
+                ),
+                daemon=True,
+            )
+            process.start()
+            processes.append(process)
+
+        weights = np.empty(workers, model.dtype)
+        grads = np.empty_like(model.params)
+        for i in range(iterations):
+            loss = 0.0
+            for step in range(steps_per_epoch):
+                control[1], control[2] = i, step
+                start.wait()
+                done.wait()
+                total = counts.sum()
+                np.divide(counts, total, out=weights, casting="unsafe")
+                np.dot(weights, slots, out=grads)  # weighted all-reduce
+                optimizer.step(params, grads)
+                loss += float(step_losses @ counts)
+            loss /= m  # every sample is seen exactly once per epoch
+            if losses is not None:
+                losses.append(loss)
+            if verbose and i % 10 == 0:
+                print("Iteration: ", i, "Loss: ", loss)
+
+        control[0] = _STOP
+        start.wait()
+        finished = True
+        trained = MLP(model.sizes, model.activations, model.dtype, params=params.copy())
+    except threading.BrokenBarrierError:
+        raise RuntimeError("a training worker failed or timed out") from None
+    finally:
+        if barriers is not None and not finished:
+            for barrier in barriers:
+                barrier.abort()  # release workers still waiting on a step
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+    return trained
@@ -0,0 +1,131 @@
+"""Post-training int8 quantization of an ``MLP`` for inference.
+
+``quantize`` stores every weight matrix as int8 with one float32 scale per
+output row (symmetric, ``scale = max|row| / 127``); biases stay float32. The
+first layer's scales also absorb the ``1 / 255`` input normalization, so
+``QuantizedMLP.predict`` consumes raw uint8 pixels without normalizing the
+whole matrix first.
+
+Two accumulation modes are available. ``"float32"`` (the default) multiplies
+the int8 weights and integer inputs in float32 through BLAS and rescales
+each row afterwards. BLAS needs float operands, so each layer's weights and
+each ``batch_size`` slice of the input are cast to float32 just for that
+product and then freed. Only the int8 arrays stay resident. ``"int32"``
+accumulates the first layer exactly in integers, but NumPy has no integer
+BLAS, so it is mainly useful as a reference. ``compare`` reports how far the
+quantized model's accuracy drifts from the float model's.
+"""
+
+import numpy as np
+
+from .mlp import ACTIVATIONS
+
+
+def _quantize_rows(W):
+    scale = np.abs(W).max(axis=1, keepdims=True) / 127.0
+    scale[scale == 0] = 1.0
+    q = np.clip(np.rint(W / scale), -127, 127).astype(np.int8)
+    return q, scale.astype(np.float32)
+
+
+class QuantizedMLP:
+    def __init__(
+        self, sizes, activations, weights, scales, biases, accumulate="float32"
+    ):
+        if accumulate not in ("float32", "int32"):
+            raise ValueError("accumulate must be 'float32' or 'int32'")
+        self.sizes = tuple(sizes)
+        self.activations = tuple(activations)
+        self.weights = list(weights)
+        self.scales = list(scales)
+        self.biases = list(biases)
+        self.accumulate = accumulate
+
+    @property
+    def nbytes(self):
+        """Resident size of the weights, scales and biases in bytes.
+
+        Scoring a batch also briefly holds one layer's weights and the batch
+        as float32.
+        """
+        return sum(a.nbytes for a in self.weights + self.scales + self.biases)
+
+    def logits(self, X):
+        """Output-layer logits for raw uint8 pixels ``X`` (784 x m)."""
+        if X.dtype != np.uint8:
+            raise TypeError("QuantizedMLP expects raw uint8 pixels")
+        last = len(self.weights) - 1
+        A = X
+        for l in range(last + 1):
+            if l == 0 and self.accumulate == "int32":
+                Z = np.matmul(self.weights[0].astype(np.int32), X.astype(np.int32))
+                Z = Z.astype(np.float32)
+            else:
+                # int8 and uint8 values are exact in float32.
+                W = self.weights[l].astype(np.float32)
+                Z = np.matmul(W, A.astype(np.float32, copy=False))
+            Z *= self.scales[l]
+            Z += self.biases[l]
+            if l < last:
+                ACTIVATIONS[self.activations[l]][0](Z, Z)
+            A = Z
+        return A
+
+    def predict(self, X, batch_size=1024):
+        predictions = np.empty(X.shape[1], np.intp)
+        for start in range(0, X.shape[1], batch_size):
+            stop = start + batch_size
+            np.argmax(self.logits(X[:, start:stop]), 0, out=predictions[start:stop])
+        return predictions
+
+    def save(self, path):
+        arrays = {"sizes": np.array(self.sizes)}
+        for l, (W, s, b) in enumerate(zip(self.weights, self.scales, self.biases)):
+            arrays["W{}".format(l)] = W
+            arrays["scale{}".format(l)] = s
+            arrays["b{}".format(l)] = b
+        np.savez(path, activations=np.array(self.activations, dtype=str), **arrays)
+
+    @classmethod
+    def load(cls, path, accumulate="float32"):
+        with np.load(path) as f:
+            layers = len(f["sizes"]) - 1
+            return cls(
+                f["sizes"].tolist(),
+                f["activations"].tolist(),
+                [f["W{}".format(l)] for l in range(layers)],
+                [f["scale{}".format(l)] for l in range(layers)],
+                [f["b{}".format(l)] for l in range(layers)],
+                accumulate,
+            )
+
+
+def quantize(model, accumulate="float32"):
+    """Return a ``QuantizedMLP`` with int8 per-row-scaled copies of ``model``'s weights."""
+    weights, scales = [], []
+    for l, W in enumerate(model.weights):
+        q, scale = _quantize_rows(W.astype(np.float64))
+        if l == 0:
+            scale /= 255.0  # consume raw 0-255 pixels directly
+        weights.append(q)
+        scales.append(scale)
+    biases = [b.astype(np.float32) for b in model.biases]
+    return QuantizedMLP(
+        model.sizes, model.activations, weights, scales, biases, accumulate
+    )
+
+
+def compare(model, quantized, X, Y):
+    """Accuracy of the float and quantized models on raw uint8 ``X``, and their drift."""
+    float_predictions = model.predict(X)
+    quantized_predictions = quantized.predict(X)
+    float_accuracy = float(np.mean(float_predictions == Y))
+    quantized_accuracy = float(np.mean(quantized_predictions == Y))
+    return {
+        "float_accuracy": float_accuracy,
+        "quantized_accuracy": quantized_accuracy,
+        "drift": quantized_accuracy - float_accuracy,
+        "agreement": float(np.mean(float_predictions == quantized_predictions)),
+        "float_bytes": model.params.nbytes,
+        "quantized_bytes": quantized.nbytes,
+    }
@@ -0,0 +1,40 @@
+"""Streaming scorer that turns ``test.csv`` into a Kaggle submission file.
+
+The CSV is read ``chunk_size`` rows at a time as uint8, each chunk is scored
+with one vectorized forward pass into a reused workspace, and its
+``ImageId,Label`` lines are appended to the output before the next chunk is
+read. Memory use depends on ``chunk_size``, not on the length of the file.
+"""
+
+import numpy as np
+
+from .mlp import load_batch
+
+
+def score_csv(model, csv_path, out_path, chunk_size=10000):
+    """Write ``ImageId,Label`` predictions for every row of ``csv_path``.
+
+    A ``label`` column, if present, is ignored, so ``train.csv`` can be
+    scored too. ImageIds start at 1, as Kaggle expects. Returns the number of
+    rows scored.
+    """
+    import pandas as pd
+
+    workspaces = {}
+    image_id = 1
+    with open(out_path, "w") as out:
+        out.write("ImageId,Label\n")
+        for chunk in pd.read_csv(csv_path, dtype=np.uint8, chunksize=chunk_size):
+            if "label" in chunk.columns:
+                chunk = chunk.drop(columns="label")
+            X = chunk.to_numpy().T
+            width = X.shape[1]
+            ws = workspaces.get(width)
+            if ws is None:
+                ws = workspaces[width] = model.workspace(width)
+            load_batch(ws, X)
+            labels = np.argmax(model.forward_logits(ws), 0)
+            ids = np.arange(image_id, image_id + width)
+            np.savetxt(out, np.column_stack((ids, labels)), fmt="%d", delimiter=",")
+            image_id += width
+    return image_id - 1
@@ -0,0 +1,93 @@
+"""Versioned on-disk format for trained ``MLP`` models.
+
+A model file is::
+
+    b"MNISTMLP"                 8-byte magic
+    version, header_len         two little-endian uint32
+    header                      JSON: sizes, activations, dtype, count
+    padding                     up to a 64-byte boundary
+    params                      the flat parameter vector, raw
+
+Because the parameters are stored exactly as the model's flat buffer,
+``load_model`` can memory-map them read-only and hand the map to ``MLP`` as
+its ``params``. No copy is made, so every inference worker that loads the
+same file shares one page-cache copy of the weights, and loading takes
+about as long as reading the header.
+"""
+
+import json
+import os
+import struct
+
+import numpy as np
+
+from .mlp import MLP
+
+MAGIC = b"MNISTMLP"
+VERSION = 1
+ALIGNMENT = 64
+_PREFIX = struct.Struct("<8sII")
+
+
+def save_model(path, model):
+    """Write ``model`` to ``path`` atomically (via a temporary file and rename)."""
+    header = json.dumps(
+        {
+            "sizes": list(model.sizes),
+            "activations": list(model.activations),
+            "dtype": model.dtype.newbyteorder("<").str,
+            "count": int(model.params.size),
+        }
+    ).encode()
+    offset = _PREFIX.size + len(header)
+    padding = -offset % ALIGNMENT
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        f.write(b"\0" * padding)
+        f.write(model.params.astype(model.dtype.newbyteorder("<"), copy=False).data)
+    os.replace(tmp_path, path)
+
+
+def read_header(path):
+    """Return ``(header, data_offset)`` for the model file at ``path``."""
+    with open(path, "rb") as f:
+        prefix = f.read(_PREFIX.size)
+        if len(prefix) < _PREFIX.size:
+            raise ValueError("{}: not an MNIST model file".format(path))
+        magic, version, header_len = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError("{}: not an MNIST model file".format(path))
+        if version != VERSION:
+            raise ValueError(
+                "{}: unsupported model format version {}".format(path, version)
+            )
+        header = json.loads(f.read(header_len))
+    offset = _PREFIX.size + header_len
+    return header, offset + (-offset % ALIGNMENT)
+
+
+def load_model(path, mmap=True):
+    """Load a model saved by ``save_model``.
+
+    With ``mmap`` (the default) the parameters are a read-only memory map of
+    the file, suitable for inference only. Pass ``mmap=False`` for a private,
+    writable copy that can be trained further.
+    """
+    header, offset = read_header(path)
+    dtype = np.dtype(header["dtype"])
+    count = header["count"]
+    if mmap:
+        params = np.memmap(path, dtype, mode="r", offset=offset, shape=(count,))
+    else:
+        params = np.fromfile(path, dtype, count=count, offset=offset)
+    if params.size != count:
+        raise ValueError("{}: truncated parameter data".format(path))
+    return MLP(
+        header["sizes"],
+        header["activations"],
+        dtype.newbyteorder("="),
+        params=params,
+    )
@@ -0,0 +1,74 @@
+"""Optional sparse input representation for the first layer.
+
+Most pixels of a scanned digit are zero, but ``W1 @ X`` and ``dZ1 @ X.T``
+multiply over the whole dense 784 x m matrix. ``sparsify`` turns the image
+matrix into a SciPy CSC matrix of already-scaled pixels, one column per
+sample, so mini-batches slice whole columns cheaply. ``input_dot`` and
+``input_grad`` then compute the first-layer product and weight gradient with
+sparse kernels. ``network.forward_prop``/``backward_prop`` and ``MLP`` both
+accept such a matrix wherever they accept the dense ``X``.
+
+The sparse kernels are not multithreaded like BLAS. On a typical machine
+they only win below roughly 10% nonzero pixels; Kaggle's MNIST sits near
+19%. ``sparsify`` therefore measures the density and returns ``X``
+unchanged above ``threshold`` (default ``SPARSE_DENSITY``). Pass
+``threshold=1`` to force the sparse path. SciPy is only needed when a
+sparse matrix is actually built.
+"""
+
+import numpy as np
+
+SPARSE_DENSITY = 0.1
+CHUNK_COLUMNS = 4096
+
+
+def issparse(X):
+    return getattr(X, "format", None) in ("csr", "csc")
+
+
+def density(X, chunk_columns=CHUNK_COLUMNS):
+    """Fraction of nonzero entries; dense input is scanned in column chunks."""
+    if issparse(X):
+        return X.nnz / float(np.prod(X.shape))
+    nonzero = 0
+    for start in range(0, X.shape[1], chunk_columns):
+        nonzero += np.count_nonzero(X[:, start : start + chunk_columns])
+    return nonzero / float(X.size)
+
+
+def sparsify(X, threshold=SPARSE_DENSITY, dtype=np.float32):
+    """Return ``X`` as a scaled CSC matrix if its density is at most ``threshold``.
+
+    Raw uint8 pixels are scaled to [0, 1] like ``mlp.load_batch`` does.
+    Otherwise ``X`` is returned as is, so callers can always pass the result
+    on to training or prediction.
+    """
+    if issparse(X) or density(X) > threshold:
+        return X
+    from scipy import sparse  # optional dependency
+
+    scale = 1 / 255.0 if X.dtype == np.uint8 else 1.0
+    blocks = []
+    for start in range(0, X.shape[1], CHUNK_COLUMNS):
+        block = sparse.csc_matrix(X[:, start : start + CHUNK_COLUMNS], dtype=dtype)
+        block.data *= scale
+        blocks.append(block)
+    return sparse.hstack(blocks, format="csc", dtype=dtype)
+
+
+def input_dot(W, X, out=None):
+    """``W @ X`` for a sparse ``X``, computed as ``(X.T @ W.T).T``."""
+    result = (X.T @ W.T).T
+    if out is None:
+        return result
+    out[...] = result
+    return out
+
+
+def input_grad(dZ, X, out=None):
+    """``dZ @ X.T`` for a sparse ``X``, computed as ``(X @ dZ.T).T``."""
+    result = (X @ dZ.T).T
+    if out is None:
+        return result
+    out[...] = result
+    return out
@@ -0,0 +1,108 @@
+"""Parallel hyperparameter sweeps over ``gradient_descent``.
+
+The training and dev sets are copied once into ``multiprocessing`` shared
+memory, and every worker attaches to those blocks in its pool initializer and
+wraps them in NumPy views. A task therefore pickles only its small config
+dict, never the data. Images are shared in row-major (one image per row)
+order, the same layout as the dataset cache, so batch gathers read whole
+rows.
+
+Sweeps scale best with one BLAS thread per worker: start the interpreter with
+``OMP_NUM_THREADS=1`` (or ``OPENBLAS_NUM_THREADS=1``) and let ``max_workers``
+provide the parallelism.
+"""
+
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .mlp import MLP
+from .train import gradient_descent
+
+_shared = {}  # worker-side views onto the parent's shared blocks
+
+
+def grid(**axes):
+    """Return the cartesian product of ``axes`` as a list of config dicts.
+
+    ``grid(alpha=[0.05, 0.1], batch_size=[64, 128], iterations=[20])`` gives
+    four configs.
+    """
+    keys = list(axes)
+    return [dict(zip(keys, values)) for values in itertools.product(*axes.values())]
+
+
+def _share(array):
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def _attach(specs):
+    for key, (name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=name)
+        _shared[key] = (shm, np.ndarray(shape, dtype, buffer=shm.buf))
+
+
+def _run(config):
+    X = _shared["X"][1].T
+    Y = _shared["Y"][1]
+    X_dev = _shared["X_dev"][1].T
+    Y_dev = _shared["Y_dev"][1]
+
+    kwargs = dict(config)
+    seed = kwargs.pop("seed", None)
+    if seed is not None:
+        np.random.seed(seed)
+    sizes = kwargs.pop("sizes", None)
+    activations = kwargs.pop("activations", None)
+    if sizes is not None:
+        kwargs["model"] = MLP(sizes, activations, kwargs.get("dtype", np.float32))
+
+    losses = []
+    start = time.perf_counter()
+    model = gradient_descent(X, Y, losses=losses, **kwargs)
+    seconds = time.perf_counter() - start
+    dev_accuracy = float(np.mean(model.predict(X_dev) == Y_dev))
+
+    row = dict(config)
+    row.update(
+        dev_accuracy=dev_accuracy,
+        loss=losses[-1] if losses else float("nan"),
+        seconds=seconds,
+    )
+    return row
+
+
+def sweep(configs, X, Y, X_dev, Y_dev, max_workers=None):
+    """Train one model per config in a process pool and tabulate the results.
+
+    Each config holds ``gradient_descent`` keyword arguments (``alpha`` and
+    ``iterations`` are required) plus the optional extras ``sizes``,
+    ``activations`` (passed to ``MLP``) and ``seed``. Returns a pandas
+    DataFrame with one row per config, its dev accuracy, final training loss
+    and wall-clock training time, best dev accuracy first.
+    """
+    import pandas as pd
+
+    blocks = []
+    try:
+        specs = {}
+        for key, array in (("X", X.T), ("Y", Y), ("X_dev", X_dev.T), ("Y_dev", Y_dev)):
+            shm, specs[key] = _share(array)
+            blocks.append(shm)
+        with ProcessPoolExecutor(
+            max_workers, initializer=_attach, initargs=(specs,)
+        ) as pool:
+            rows = list(pool.map(_run, configs))
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    table = pd.DataFrame(rows)
+    return table.sort_values("dev_accuracy", ascending=False, ignore_index=True)
@@ -0,0 +1,92 @@
+"""Per-iteration training telemetry for ``gradient_descent``.
+
+``gradient_descent(..., telemetry=hook)`` calls ``hook.begin_iteration(i)``
+before every iteration and ``hook.end_iteration(record)`` after it. The
+record is a flat dict with the iteration number, mean loss, training
+accuracy, sample count and wall-clock seconds spent loading batches and in
+the forward, backward and update phases. Any object with those two methods
+can be plugged in. ``Telemetry`` is the stock implementation: it keeps the
+most recent records in a ring buffer and can stream them to a JSONL or CSV
+file. Console output is off unless ``console=True``.
+"""
+
+import collections
+import csv
+import json
+import os
+import tracemalloc
+
+
+class Telemetry:
+    """Ring buffer of iteration records with optional file and console sinks.
+
+    ``path`` ending in ``.csv`` is written as CSV, anything else as JSONL.
+    With ``track_allocations`` the peak number of bytes allocated during each
+    iteration is added as ``alloc_peak_bytes``. That uses ``tracemalloc``,
+    which slows Python-level allocation, so it is off by default.
+    """
+
+    def __init__(
+        self,
+        capacity=1000,
+        path=None,
+        console=False,
+        console_every=10,
+        track_allocations=False,
+    ):
+        self.records = collections.deque(maxlen=capacity)
+        self.console = console
+        self.console_every = console_every
+        self.track_allocations = track_allocations
+        self._file = None
+        self._csv = None
+        self._started_tracing = False
+        if path is not None:
+            self._file = open(path, "w", newline="")
+            self._is_csv = os.path.splitext(path)[1].lower() == ".csv"
+
+    def begin_iteration(self, iteration):
+        if not self.track_allocations:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        tracemalloc.reset_peak()
+        self._alloc_base = tracemalloc.get_traced_memory()[0]
+
+    def end_iteration(self, record):
+        if self.track_allocations:
+            record["alloc_peak_bytes"] = (
+                tracemalloc.get_traced_memory()[1] - self._alloc_base
+            )
+        self.records.append(record)
+        if self._file is not None:
+            self._write(record)
+        if self.console and record["iteration"] % self.console_every == 0:
+            print(
+                "Iteration: {iteration}  loss: {loss:.4f}  accuracy: {accuracy:.4f}"
+                "  ({seconds:.3f}s)".format(**record)
+            )
+
+    def _write(self, record):
+        if not self._is_csv:
+            self._file.write(json.dumps(record) + "\n")
+            return
+        if self._csv is None:
+            self._csv = csv.DictWriter(self._file, fieldnames=list(record))
+            self._csv.writeheader()
+        self._csv.writerow(record)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,109 @@
+"""Training loop for the MNIST networks in ``mnist.mlp``."""
+
+import time
+
+import numpy as np
+
+from .mlp import MLP, load_batch, one_hot
+from .optim import SGD
+
+
+def gradient_descent(
+    X,
+    Y,
+    alpha,
+    iterations,
+    batch_size=None,
+    shuffle=True,
+    dtype=np.float32,
+    losses=None,
+    model=None,
+    telemetry=None,
+    verbose=False,
+    optimizer=None,
+    early_stopping=None,
+):
+    """Train on the columns of ``X`` (raw uint8 or scaled floats) and labels ``Y``.
+
+    ``model`` is any ``MLP``; by default a fresh 784-10-10 network of ``dtype``
+    is created. With ``batch_size`` set every iteration is one epoch of
+    mini-batches; otherwise each iteration is a single full-batch step. If
+    ``losses`` is a list, the mean training cross-entropy of every iteration is
+    appended to it. ``telemetry`` receives per-iteration timings and metrics
+    (see ``mnist.telemetry``); ``verbose`` prints the loss every 10
+    iterations. ``optimizer`` is any optimizer from ``mnist.optim``; ``alpha``
+    is only used as the learning rate of the default ``SGD``. With an
+    ``EarlyStopping`` from ``mnist.early_stopping`` training may end before
+    ``iterations`` and the best parameters it saw are restored. Returns the
+    trained model.
+    """
+    if model is None:
+        model = MLP((X.shape[0], 10, 10), dtype=dtype)
+    if optimizer is None:
+        optimizer = SGD(alpha)
+    one_hot_Y = one_hot(Y, model.sizes[-1], model.dtype)
+    m = Y.size
+    full_batch = batch_size is None or batch_size >= m
+    if full_batch:
+        batch_size = m
+    order = np.arange(m)
+    workspaces = {}  # at most two widths: batch_size and the epoch's tail
+    clock = time.perf_counter
+    for i in range(iterations):
+        if telemetry is not None:
+            telemetry.begin_iteration(i)
+        started = clock()
+        load_s = forward_s = backward_s = update_s = 0.0
+        correct = 0
+        if shuffle and not full_batch:
+            np.random.shuffle(order)
+        loss = 0.0
+        for start in range(0, m, batch_size):
+            t0 = clock()
+            idx = order[start : start + batch_size]
+            ws = workspaces.get(idx.size)
+            if ws is None:
+                ws = workspaces[idx.size] = model.workspace(idx.size)
+                load_batch(ws, X, one_hot_Y, idx)
+            elif not full_batch:
+                load_batch(ws, X, one_hot_Y, idx)
+            t1 = clock()
+            model.forward_logits(ws)
+            t2 = clock()
+            loss += model.backward(ws) * idx.size
+            t3 = clock()
+            optimizer.step(model.params, model.grads)
+            t4 = clock()
+            load_s += t1 - t0
+            forward_s += t2 - t1
+            backward_s += t3 - t2
+            update_s += t4 - t3
+            if telemetry is not None:
+                predictions = np.argmax(ws.A[-1], 0)
+                correct += int(np.count_nonzero(predictions == Y[idx]))
+        loss /= m
+        if losses is not None:
+            losses.append(loss)
+        stop = early_stopping is not None and early_stopping.update(model, i)
+        if telemetry is not None:
+            record = {
+                "iteration": i,
+                "loss": loss,
+                "accuracy": correct / m,
+                "samples": m,
+                "seconds": clock() - started,
+                "load_s": load_s,
+                "forward_s": forward_s,
+                "backward_s": backward_s,
+                "update_s": update_s,
+            }
+            if early_stopping is not None:
+                record["dev_accuracy"] = early_stopping.last_accuracy
+            telemetry.end_iteration(record)
+        if verbose and i % 10 == 0:
+            print("Iteration: ", i, "Loss: ", loss)
+        if stop:
+            break
+    if early_stopping is not None:
+        early_stopping.restore(model)
+    return model
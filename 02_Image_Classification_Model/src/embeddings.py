@@ -0,0 +1,230 @@
+"""Cached backbone embeddings for fast retraining of the classifier head.
+
+Retraining only the ``Dense(256)``/``Dense(1)`` head still ran every image
+through all three Conv2D/MaxPooling2D blocks on every epoch. ``split_model``
+cuts the CNN after its ``Flatten`` layer into a backbone and a head, both
+sharing their layers with the full model. ``embed_files`` runs the
+backbone once per image and stores the flattened features as float16 in
+``cache_dir/<backbone hash>/``, keyed by the SHA-256 of each image file.
+Each call adds a chunk file holding only the images that were missing.
+Changing the backbone weights changes the directory, so stale features are
+never reused. The image hashes are remembered in ``cache_dir/hashes.json``
+by path, size and mtime, so only new or modified files are read again.
+
+``train_head`` then fits the head on the cached features; since the head's
+layers are the model's own, the full model is updated in place. The
+convolutional layers are left trainable: the backbone only runs in
+inference mode and the head's optimizer never sees their weights.
+``best_threshold`` picks the decision threshold from cached probabilities.
+"""
+
+import glob
+import hashlib
+import json
+import os
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.layers import Flatten, Input
+from tensorflow.keras.models import Sequential
+
+from pipeline import AUTOTUNE, IMAGE_SIZE, list_files, load_image, split_files
+
+CHUNK_PATTERN = "chunk-{:05d}.npz"
+HASHES_NAME = "hashes.json"
+HASHES_VERSION = 1
+
+
+def split_model(model):
+    """Return ``(backbone, head)`` sharing layers with ``model``, split after ``Flatten``."""
+    for cut, layer in enumerate(model.layers):
+        if isinstance(layer, Flatten):
+            break
+    else:
+        raise ValueError("model has no Flatten layer to split at")
+    backbone = Sequential(
+        [Input(shape=model.input_shape[1:])] + model.layers[: cut + 1]
+    )
+    head = Sequential(
+        [Input(shape=model.layers[cut].output.shape[1:])] + model.layers[cut + 1 :]
+    )
+    return backbone, head
+
+
+def weights_hash(model):
+    digest = hashlib.sha256()
+    for weight in model.get_weights():
+        digest.update(str(weight.shape).encode())
+        digest.update(np.ascontiguousarray(weight).tobytes())
+    return digest.hexdigest()
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_hashes(paths, hashes_path):
+    """SHA-256 of each of ``paths``, reading only files not in ``hashes_path``."""
+    known = {}
+    if os.path.exists(hashes_path):
+        with open(hashes_path) as f:
+            hashes = json.load(f)
+        if hashes.get("version") == HASHES_VERSION:
+            known = hashes["files"]
+    keys = []
+    changed = False
+    for path in paths:
+        name = os.path.abspath(path)
+        stat = os.stat(path)
+        entry = known.get(name)
+        if entry is None or entry[0] != stat.st_size or entry[1] != stat.st_mtime_ns:
+            entry = known[name] = [stat.st_size, stat.st_mtime_ns, file_hash(path)]
+            changed = True
+        keys.append(entry[2])
+    if changed:
+        tmp_path = hashes_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": HASHES_VERSION, "files": known}, f)
+        os.replace(tmp_path, hashes_path)
+    return keys
+
+
+def load_cache(cache_dir):
+    """Return ``{image hash: features}`` for every chunk in ``cache_dir``."""
+    features = {}
+    for path in sorted(glob.glob(os.path.join(cache_dir, "chunk-*.npz"))):
+        with np.load(path) as chunk:
+            features.update(zip(chunk["keys"].tolist(), chunk["features"]))
+    return features
+
+
+def embed_files(
+    backbone, paths, cache_dir, batch_size=64, image_size=IMAGE_SIZE, verbose=True
+):
+    """Backbone features (float32, one row per path), computing only uncached images."""
+    hashes_path = os.path.join(cache_dir, HASHES_NAME)
+    cache_dir = os.path.join(cache_dir, weights_hash(backbone)[:16])
+    os.makedirs(cache_dir, exist_ok=True)
+    cached = load_cache(cache_dir)
+    keys = file_hashes(paths, hashes_path)
+    missing = {}
+    for path, key in zip(paths, keys):
+        if key not in cached:
+            missing.setdefault(key, path)  # duplicate files are embedded once
+
+    if missing:
+        ds = tf.data.Dataset.from_tensor_slices(list(missing.values()))
+        ds = ds.map(
+            lambda path: load_image(path, image_size), num_parallel_calls=AUTOTUNE
+        )
+        ds = ds.batch(batch_size).map(
+            lambda images: tf.cast(images, tf.float32) / 255.0,
+            num_parallel_calls=AUTOTUNE,
+        )
+        features = np.concatenate(
+            [
+                np.asarray(backbone.predict_on_batch(images), np.float16)
+                for images in ds.prefetch(AUTOTUNE)
+            ]
+        )
+        chunk = len(glob.glob(os.path.join(cache_dir, "chunk-*.npz")))
+        tmp_path = os.path.join(cache_dir, "tmp-" + CHUNK_PATTERN.format(chunk))
+        np.savez(tmp_path, keys=np.array(list(missing)), features=features)
+        os.replace(tmp_path, os.path.join(cache_dir, CHUNK_PATTERN.format(chunk)))
+        cached.update(zip(missing, features))
+    if verbose:
+        print(
+            "{} images: {} cached, {} embedded".format(
+                len(paths), len(paths) - len(missing), len(missing)
+            )
+        )
+    return np.stack([cached[key] for key in keys]).astype(np.float32)
+
+
+def train_head(
+    model,
+    data_dir,
+    cache_dir,
+    epochs=20,
+    validation_split=0.2,
+    seed=123,
+    batch_size=32,
+    optimizer="adam",
+    verbose=True,
+):
+    """Fit ``model``'s head on cached backbone features of ``data_dir``.
+
+    The split matches ``pipeline.make_datasets`` with the same ``seed``.
+    Returns ``(history, val_probabilities, val_labels)``, the latter two for
+    ``best_threshold``.
+    """
+    backbone, head = split_model(model)
+    paths, labels, _ = list_files(data_dir)
+    (train_paths, train_labels), (val_paths, val_labels) = split_files(
+        paths, labels, validation_split, seed
+    )
+    train_features = embed_files(
+        backbone, list(train_paths), cache_dir, verbose=verbose
+    )
+    train = (
+        tf.data.Dataset.from_tensor_slices((train_features, train_labels))
+        .shuffle(len(train_features), seed=seed)
+        .batch(batch_size)
+    )
+    val = None
+    if len(val_paths):
+        val_features = embed_files(
+            backbone, list(val_paths), cache_dir, verbose=verbose
+        )
+        val = tf.data.Dataset.from_tensor_slices((val_features, val_labels)).batch(
+            batch_size
+        )
+
+    head.compile(optimizer, loss=tf.losses.BinaryCrossentropy(), metrics=["accuracy"])
+    history = head.fit(
+        train, epochs=epochs, validation_data=val, verbose=2 if verbose else 0
+    )
+    if val is None:
+        return history.history, None, None
+    val_probabilities = np.asarray(head.predict(val, verbose=0)).reshape(-1)
+    return history.history, val_probabilities, val_labels
+
+
+def best_threshold(probabilities, labels, metric="accuracy"):
+    """Return ``(threshold, score)`` maximizing ``"accuracy"`` or ``"f1"``."""
+    order = np.argsort(probabilities)[::-1]
+    sorted_labels = np.asarray(labels)[order] > 0
+    # Predicting the top k as positive, for every k at once.
+    tp = np.concatenate([[0], np.cumsum(sorted_labels)])
+    fp = np.concatenate([[0], np.cumsum(~sorted_labels)])
+    positives = sorted_labels.sum()
+    if metric == "accuracy":
+        scores = (tp + (len(sorted_labels) - positives - fp)) / len(sorted_labels)
+    elif metric == "f1":
+        scores = 2 * tp / np.maximum(tp + fp + positives, 1)
+    else:
+        raise ValueError("metric must be 'accuracy' or 'f1', got {!r}".format(metric))
+    sorted_probabilities = np.asarray(probabilities)[order]
+    # A threshold cannot split equal probabilities, so only cut between
+    # distinct values (or before the first / after the last).
+    cuts = np.concatenate(
+        [[True], sorted_probabilities[:-1] != sorted_probabilities[1:], [True]]
+    )
+    k = int(np.argmax(np.where(cuts, scores, -np.inf)))
+    # Predictions count as positive above the threshold, as in the Keras
+    # metrics. The midpoint of the k-th and (k+1)-th probability is used,
+    # computed in their own dtype so it cannot round onto the k-th.
+    if k == 0:
+        threshold = sorted_probabilities[0]
+    elif k == len(sorted_probabilities):
+        threshold = np.nextafter(sorted_probabilities[-1], -np.inf)
+    else:
+        above, below = sorted_probabilities[k - 1], sorted_probabilities[k]
+        threshold = below + (above - below) / 2
+        if threshold >= above:
+            threshold = below
+    return float(threshold), float(scores[k])
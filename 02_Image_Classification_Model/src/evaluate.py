@@ -0,0 +1,102 @@
+"""Single-pass evaluation of the binary classifier.
+
+The notebook's metrics loop pulled every test batch out to NumPy, called
+``model.predict`` on it (building a new predict loop each time) and updated
+``Precision``/``Recall``/``BinaryAccuracy`` eagerly. ``evaluate`` streams the
+whole dataset through one ``tf.function``. The loop over batches, the
+forward pass and a running 2x2 confusion matrix all stay in the graph;
+only the four counts come back to Python, where precision, recall and
+accuracy are derived from them. Predictions count as positive when they
+are above ``threshold``, the same rule as the Keras metrics.
+
+From the command line::
+
+    python evaluate.py models/imageclassifier.keras test
+"""
+
+import argparse
+import os
+
+import tensorflow as tf
+
+
+def confusion_matrix(model, dataset, threshold=0.5, jit_compile=False):
+    """Return the ``[[tn, fp], [fn, tp]]`` counts of ``model`` on ``dataset`` as int64."""
+
+    @tf.function(jit_compile=jit_compile)
+    def step(x, y, counts):
+        predicted = tf.reshape(model(x, training=False), [-1]) > threshold
+        actual = tf.reshape(y, [-1]) > 0
+        return counts + tf.math.confusion_matrix(
+            tf.cast(actual, tf.int32),
+            tf.cast(predicted, tf.int32),
+            num_classes=2,
+            dtype=tf.int64,
+        )
+
+    @tf.function
+    def run(dataset):
+        counts = tf.zeros((2, 2), tf.int64)
+        for x, y in dataset:
+            counts = step(x, y, counts)
+        return counts
+
+    return run(dataset).numpy()
+
+
+def _ratio(numerator, denominator):
+    return float(numerator) / denominator if denominator else 0.0
+
+
+def evaluate(model, dataset, threshold=0.5, jit_compile=False):
+    """Precision, recall, accuracy and the confusion matrix of ``model`` on ``dataset``.
+
+    ``jit_compile`` compiles the per-batch step with XLA, see ``model.py``.
+    """
+    matrix = confusion_matrix(model, dataset, threshold, jit_compile)
+    (tn, fp), (fn, tp) = matrix
+    return {
+        "precision": _ratio(tp, tp + fp),
+        "recall": _ratio(tp, tp + fn),
+        "accuracy": _ratio(tp + tn, matrix.sum()),
+        "confusion_matrix": matrix,
+        "samples": int(matrix.sum()),
+    }
+
+
+def load_dataset(path, split="train", batch_size=32):
+    """Dataset for a shard directory written by ``shards.py``, or an image folder."""
+    from pipeline import build_dataset, list_files
+    from shards import INDEX_NAME, load_shards
+
+    if os.path.exists(os.path.join(path, INDEX_NAME)):
+        return load_shards(path, split, batch_size, shuffle=False)
+    paths, labels, _ = list_files(path)
+    return build_dataset(paths, labels, batch_size)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("model_path")
+    parser.add_argument("data", help="image folder or shard directory")
+    parser.add_argument("--split", default="train", help="split of a shard directory")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--jit-compile", action="store_true")
+    args = parser.parse_args(argv)
+
+    model = tf.keras.models.load_model(args.model_path)
+    dataset = load_dataset(args.data, args.split, args.batch_size)
+    results = evaluate(model, dataset, args.threshold, args.jit_compile)
+    (tn, fp), (fn, tp) = results["confusion_matrix"]
+    print("samples   {}".format(results["samples"]))
+    print("precision {:.4f}".format(results["precision"]))
+    print("recall    {:.4f}".format(results["recall"]))
+    print("accuracy  {:.4f}".format(results["accuracy"]))
+    print("confusion matrix (rows: actual, columns: predicted)")
+    print("  tn {:>8}  fp {:>8}".format(tn, fp))
+    print("  fn {:>8}  tp {:>8}".format(fn, tp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Export the classifier for CPU serving and compare the formats.
+
+The notebook saved a legacy ``.h5`` file, which is slow to load and runs at
+full float32 cost. ``export_all`` writes, next to the native ``.keras``
+file:
+
+- ``saved_model/``, a TensorFlow SavedModel for TF Serving and other
+  runtimes that load graphs;
+- ``model_float32.tflite``, a plain TFLite conversion;
+- ``model_dynamic.tflite``, with int8 weights and float activations
+  (dynamic-range quantization);
+- ``model_int8.tflite``, with int8 weights and activations. Its activation
+  ranges are calibrated on a random sample of images from ``train/``. The
+  model keeps float32 input and output, so callers feed the same scaled
+  images as every other format.
+
+``benchmark`` loads each artifact and measures load time, size on disk,
+single-image latency, batch throughput and accuracy on a labelled folder::
+
+    python export.py models/imageclassifier.keras --calibration train --eval test
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from pipeline import IMAGE_SIZE, list_files, load_image
+
+QUANTIZATIONS = ("float32", "dynamic", "int8")
+CALIBRATION_SAMPLES = 200
+
+
+def load_images(paths, image_size=IMAGE_SIZE):
+    """Decode ``paths`` into one scaled float32 batch."""
+    images = np.stack([load_image(path, image_size).numpy() for path in paths])
+    return images.astype(np.float32) / np.float32(255)
+
+
+def sample_files(data_dir, samples, seed=0):
+    paths, labels, _ = list_files(data_dir)
+    rng = np.random.default_rng(seed)
+    idx = rng.choice(len(paths), min(samples, len(paths)), replace=False)
+    return [paths[i] for i in idx], labels[idx]
+
+
+def export_saved_model(model, path):
+    if hasattr(model, "export"):  # Keras 3
+        model.export(path)
+    else:
+        tf.saved_model.save(model, path)
+    return path
+
+
+def export_tflite(
+    saved_model_dir,
+    path,
+    quantization="dynamic",
+    calibration_dir=None,
+    samples=CALIBRATION_SAMPLES,
+):
+    """Convert a SavedModel to TFLite with the given ``quantization``."""
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(
+            "quantization must be one of {}, got {!r}".format(
+                QUANTIZATIONS, quantization
+            )
+        )
+    converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+    if quantization != "float32":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == "int8":
+        if calibration_dir is None:
+            raise ValueError("int8 quantization needs a calibration_dir")
+        paths, _ = sample_files(calibration_dir, samples)
+
+        def representative_dataset():
+            for path in paths:
+                yield [load_images([path])]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    with open(path, "wb") as f:
+        f.write(converter.convert())
+    return path
+
+
+def export_all(model_path, out_dir, calibration_dir=None, samples=CALIBRATION_SAMPLES):
+    """Write every export format of ``model_path`` to ``out_dir``; returns ``{name: path}``."""
+    os.makedirs(out_dir, exist_ok=True)
+    model = tf.keras.models.load_model(model_path)
+    saved_model_dir = export_saved_model(model, os.path.join(out_dir, "saved_model"))
+    artifacts = {"keras": model_path, "saved_model": saved_model_dir}
+    for quantization in QUANTIZATIONS:
+        if quantization == "int8" and calibration_dir is None:
+            continue
+        path = os.path.join(out_dir, "model_{}.tflite".format(quantization))
+        export_tflite(saved_model_dir, path, quantization, calibration_dir, samples)
+        artifacts["tflite_" + quantization] = path
+    return artifacts
+
+
+def _size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def load_predictor(path, num_threads=None):
+    """Return ``predict(images) -> probabilities`` for any exported format."""
+    if path.endswith(".tflite"):
+        interpreter = tf.lite.Interpreter(model_path=path, num_threads=num_threads)
+        input_index = interpreter.get_input_details()[0]["index"]
+        output_index = interpreter.get_output_details()[0]["index"]
+        shape = [None]
+
+        def predict(images):
+            if shape[0] != images.shape:
+                interpreter.resize_tensor_input(input_index, images.shape)
+                interpreter.allocate_tensors()
+                shape[0] = images.shape
+            interpreter.set_tensor(input_index, images)
+            interpreter.invoke()
+            return interpreter.get_tensor(output_index).reshape(-1)
+
+        return predict
+    if os.path.isdir(path):
+        serve = tf.saved_model.load(path).signatures["serving_default"]
+
+        def predict(images):
+            outputs = serve(tf.constant(images))
+            return next(iter(outputs.values())).numpy().reshape(-1)
+
+        return predict
+    model = tf.keras.models.load_model(path)
+    return lambda images: np.asarray(model.predict_on_batch(images)).reshape(-1)
+
+
+def benchmark(artifacts, eval_dir, samples=256, batch_size=32, repeats=20):
+    """Measure each of ``artifacts`` (``{name: path}``) on a sample of ``eval_dir``."""
+    paths, labels = sample_files(eval_dir, samples, seed=1)
+    images = load_images(paths)
+    results = []
+    for name, path in artifacts.items():
+        start = time.perf_counter()
+        predict = load_predictor(path)
+        predict(images[:1])  # first call traces / allocates
+        load_s = time.perf_counter() - start
+
+        latencies = []
+        for i in range(repeats):
+            image = images[i % len(images)][None]
+            start = time.perf_counter()
+            predict(image)
+            latencies.append(time.perf_counter() - start)
+
+        probabilities = []
+        start = time.perf_counter()
+        for begin in range(0, len(images), batch_size):
+            probabilities.append(predict(images[begin : begin + batch_size]))
+        batch_s = time.perf_counter() - start
+        probabilities = np.concatenate(probabilities)
+
+        results.append(
+            {
+                "format": name,
+                "size_bytes": _size(path),
+                "load_s": load_s,
+                "latency_ms": float(np.median(latencies)) * 1e3,
+                "images_per_s": len(images) / batch_s,
+                "accuracy": float(np.mean((probabilities > 0.5) == labels)),
+            }
+        )
+    return results
+
+
+def format_table(results):
+    header = "{:<16} {:>10} {:>8} {:>12} {:>10} {:>9}".format(
+        "format", "size MiB", "load s", "latency ms", "images/s", "accuracy"
+    )
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            "{:<16} {:>10.2f} {:>8.2f} {:>12.2f} {:>10.1f} {:>9.4f}".format(
+                r["format"],
+                r["size_bytes"] / 2**20,
+                r["load_s"],
+                r["latency_ms"],
+                r["images_per_s"],
+                r["accuracy"],
+            )
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("model_path", help="trained .keras model")
+    parser.add_argument("--out", default="exported")
+    parser.add_argument("--calibration", help="image folder for int8 calibration")
+    parser.add_argument("--samples", type=int, default=CALIBRATION_SAMPLES)
+    parser.add_argument("--eval", help="labelled image folder to benchmark on")
+    args = parser.parse_args(argv)
+
+    artifacts = export_all(args.model_path, args.out, args.calibration, args.samples)
+    for name, path in artifacts.items():
+        print("{:<16} {}".format(name, path))
+    if args.eval:
+        print()
+        print(format_table(benchmark(artifacts, args.eval)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Headless bulk inference over folders or file lists.
+
+The notebook classified one image at a time. Each image went through
+``cv2.imread`` (which returns BGR, while training used RGB) and
+``tf.image.resize``, was plotted twice and was then passed to a
+batch-of-one ``model.predict``. ``predict_files`` instead decodes and
+resizes images in parallel with ``tf.data``, with the same ``load_image``
+as training. It predicts in large batches and appends each batch's
+results to a CSV or JSONL file as soon as they are ready. When the output
+file already exists, the paths it lists are skipped, so an interrupted run
+picks up where it stopped. Files that cannot be decoded are written with
+an empty probability and ``error`` as their label.
+
+From the command line::
+
+    python inference.py models/imageclassifier.keras uploads/ --output predictions.csv
+    python inference.py models/imageclassifier.keras --file-list todo.txt --output predictions.jsonl
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import tensorflow as tf
+
+from pipeline import AUTOTUNE, IMAGE_EXTS, IMAGE_SIZE, load_image, scale
+
+CLASS_NAMES = ("cats", "dogs")
+FIELDS = ("path", "probability", "label")
+
+
+def find_images(inputs, image_exts=IMAGE_EXTS):
+    """Expand files and directories (searched recursively) into a sorted path list."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, names in os.walk(item):
+                paths.extend(
+                    os.path.join(root, name)
+                    for name in names
+                    if os.path.splitext(name)[1].lower() in image_exts
+                )
+        else:
+            paths.append(item)
+    return sorted(paths)
+
+
+def read_file_list(path):
+    with sys.stdin if path == "-" else open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+class ResultWriter:
+    """Append-only CSV/JSONL writer that knows which paths are already done."""
+
+    def __init__(self, path):
+        self.path = path
+        self.jsonl = path.endswith((".jsonl", ".json"))
+        self.done = set()
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            self._truncate_partial_line()
+            exists = os.path.getsize(path) > 0
+            self.done = self._read_done()
+        self.file = open(path, "a", newline="")
+        if not self.jsonl:
+            self.csv = csv.writer(self.file)
+            if not exists:
+                self.csv.writerow(FIELDS)
+
+    def _truncate_partial_line(self):
+        # A killed run can leave half a row behind; drop it so it is redone.
+        # Only the tail is read, in blocks from the end of the file.
+        with open(self.path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            end = size
+            while end > 0:
+                start = max(0, end - 65536)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b"\n")
+                if newline >= 0:
+                    end = start + newline + 1
+                    break
+                end = start
+            if end < size:
+                f.truncate(end)
+
+    def _read_done(self):
+        with open(self.path, newline="") as f:
+            if self.jsonl:
+                return {json.loads(line)["path"] for line in f if line.strip()}
+            rows = csv.reader(f)
+            next(rows, None)
+            return {row[0] for row in rows if row}
+
+    def write(self, rows):
+        for path, probability, label in rows:
+            if self.jsonl:
+                record = {"path": path, "probability": probability, "label": label}
+                self.file.write(json.dumps(record) + "\n")
+            else:
+                self.csv.writerow(
+                    (path, "" if probability is None else probability, label)
+                )
+            self.done.add(path)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def predict_files(
+    model,
+    paths,
+    output,
+    batch_size=256,
+    threshold=0.5,
+    class_names=CLASS_NAMES,
+    image_size=IMAGE_SIZE,
+    verbose=True,
+):
+    """Classify ``paths`` into ``output``, skipping paths it already lists.
+
+    Returns the number of paths written by this call.
+    """
+    with ResultWriter(output) as writer:
+        todo = [path for path in dict.fromkeys(paths) if path not in writer.done]
+        if not todo:
+            return 0
+        ds = tf.data.Dataset.from_tensor_slices(todo)
+        ds = ds.map(
+            lambda path: (path, load_image(path, image_size)),
+            num_parallel_calls=AUTOTUNE,
+            deterministic=False,
+        )
+        ds = ds.ignore_errors()  # undecodable files are reported below
+        ds = ds.batch(batch_size)
+        ds = ds.map(lambda path, image: scale(image, path), num_parallel_calls=AUTOTUNE)
+        ds = ds.prefetch(AUTOTUNE)
+
+        start = time.perf_counter()
+        written = 0
+        for images, batch_paths in ds:
+            probabilities = model.predict_on_batch(images).reshape(-1)
+            writer.write(
+                (
+                    path.decode(),
+                    round(float(p), 6),
+                    class_names[int(p > threshold)],
+                )
+                for path, p in zip(batch_paths.numpy(), probabilities)
+            )
+            written += len(probabilities)
+            if verbose:
+                elapsed = time.perf_counter() - start
+                print(
+                    "{}/{} images, {:.0f} images/s".format(
+                        written, len(todo), written / elapsed
+                    ),
+                    end="\r",
+                )
+        failed = [path for path in todo if path not in writer.done]
+        writer.write((path, None, "error") for path in failed)
+        if verbose:
+            print("\n{} images classified, {} unreadable".format(written, len(failed)))
+        return written + len(failed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("model_path")
+    parser.add_argument("inputs", nargs="*", help="image files or directories")
+    parser.add_argument(
+        "--file-list", help="text file of paths, one per line; - for stdin"
+    )
+    parser.add_argument("--output", required=True, help=".csv or .jsonl file")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--class-names", nargs=2, default=list(CLASS_NAMES))
+    args = parser.parse_args(argv)
+
+    paths = find_images(args.inputs)
+    if args.file_list:
+        paths += read_file_list(args.file_list)
+    if not paths:
+        parser.error("no input images")
+    model = tf.keras.models.load_model(args.model_path)
+    predict_files(
+        model,
+        paths,
+        args.output,
+        args.batch_size,
+        args.threshold,
+        args.class_names,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""The notebook's CNN, with an opt-in XLA-compiled mode.
+
+``build_model`` returns the three Conv2D/MaxPooling2D blocks and the
+``Dense(256)``/``Dense(1)`` head from ``cats_dogs.py``. ``compile_model``
+compiles it the same way, ``adam`` with binary cross-entropy. With
+``jit_compile=True``, Keras compiles the train, test and predict functions
+with XLA. Each step then runs as one fused kernel program instead of
+dispatching every op separately. XLA runs on CPU as well as GPU, but it
+does not always win there. TensorFlow's default CPU path runs these
+convolutions through oneDNN and XLA's CPU backend does not, so measure
+before switching.
+
+``compare_step_times`` trains two copies of the model with identical
+initial weights on the same batches and reports the median step time of
+each mode::
+
+    python model.py shards/train --steps 30
+"""
+
+import argparse
+import time
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.layers import Conv2D, Dense, Flatten, Input, MaxPooling2D
+from tensorflow.keras.models import Sequential
+
+from pipeline import IMAGE_SIZE
+
+
+def build_model(input_shape=IMAGE_SIZE + (3,)):
+    return Sequential(
+        [
+            Input(shape=input_shape),
+            Conv2D(16, (3, 3), 1, activation="relu"),
+            MaxPooling2D(),
+            Conv2D(32, (3, 3), 1, activation="relu"),
+            MaxPooling2D(),
+            Conv2D(16, (3, 3), 1, activation="relu"),
+            MaxPooling2D(),
+            Flatten(),
+            Dense(256, activation="relu"),
+            Dense(1, activation="sigmoid"),
+        ]
+    )
+
+
+def compile_model(model, jit_compile=False):
+    """Compile ``model`` as the notebook does; ``jit_compile`` turns on XLA.
+
+    The default is passed explicitly as ``False`` because Keras 3 otherwise
+    picks XLA on its own ("auto"), which would blur the comparison.
+    """
+    model.compile(
+        "adam",
+        loss=tf.losses.BinaryCrossentropy(),
+        metrics=["accuracy"],
+        jit_compile=jit_compile,
+    )
+    return model
+
+
+def time_steps(model, batches, warmup=3):
+    """Median seconds per ``train_on_batch`` and ``predict_on_batch`` call.
+
+    The first ``warmup`` batches are excluded; they include tracing and,
+    with XLA, compilation.
+    """
+    train_times, predict_times = [], []
+    for i, (x, y) in enumerate(batches):
+        start = time.perf_counter()
+        model.train_on_batch(x, y)
+        train_s = time.perf_counter() - start
+        start = time.perf_counter()
+        np.asarray(model.predict_on_batch(x))
+        predict_s = time.perf_counter() - start
+        if i >= warmup:
+            train_times.append(train_s)
+            predict_times.append(predict_s)
+    if not train_times:
+        raise ValueError("need more than {} batches to time".format(warmup))
+    return {
+        "train_step_s": float(np.median(train_times)),
+        "predict_step_s": float(np.median(predict_times)),
+        "steps": len(train_times),
+    }
+
+
+def compare_step_times(dataset, steps=20, warmup=3, input_shape=None):
+    """Time the default and XLA modes on the same ``steps`` batches of ``dataset``.
+
+    Returns ``{"default": {...}, "xla": {...}, "train_speedup": ...,
+    "predict_speedup": ...}``. Speedups above 1 mean XLA is faster.
+    """
+    batches = [(x.numpy(), y.numpy()) for x, y in dataset.take(steps + warmup)]
+    if input_shape is None:
+        input_shape = batches[0][0].shape[1:]
+    reference = build_model(input_shape)
+    results = {}
+    for name, jit_compile in (("default", False), ("xla", True)):
+        model = build_model(input_shape)
+        model.set_weights(reference.get_weights())
+        compile_model(model, jit_compile)
+        results[name] = time_steps(model, batches, warmup)
+    for step in ("train", "predict"):
+        key = step + "_step_s"
+        results[step + "_speedup"] = results["default"][key] / results["xla"][key]
+    return results
+
+
+def main(argv=None):
+    from shards import load_shards
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("shard_dir", help="output directory of shards.py")
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    dataset = load_shards(args.shard_dir, "train", args.batch_size).repeat()
+    results = compare_step_times(dataset, args.steps, args.warmup)
+    for name in ("default", "xla"):
+        print(
+            "{:<8} train {:8.1f} ms/step   predict {:8.1f} ms/step".format(
+                name,
+                results[name]["train_step_s"] * 1e3,
+                results[name]["predict_step_s"] * 1e3,
+            )
+        )
+    print(
+        "XLA speedup: train {:.2f}x, predict {:.2f}x".format(
+            results["train_speedup"], results["predict_speedup"]
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""``tf.data`` input pipeline for a directory of class subfolders.
+
+``image_dataset_from_directory`` followed by an unparallelized ``map`` and a
+``skip``/``take`` split re-decodes and re-resizes every JPEG on every epoch,
+on a single core, and splits batches rather than files. ``make_datasets``
+instead:
+
+- lists the files once and splits them into train and validation sets with
+  a seeded permutation, before anything is batched;
+- decodes and resizes with ``num_parallel_calls=AUTOTUNE``;
+- optionally caches the resized uint8 images in memory (``cache=""``) or in
+  a file (``cache="path/prefix"``), so only the first epoch decodes;
+- scales whole batches to [0, 1] and prefetches with ``AUTOTUNE``.
+
+The cache holds the resized images as uint8, a quarter of the float32 size.
+Rounding the resized pixels changes each value by at most half a level
+(0.002 after scaling).
+"""
+
+import os
+
+import numpy as np
+import tensorflow as tf
+
+from validate import IMAGE_EXTS as _FORMATS
+
+AUTOTUNE = tf.data.AUTOTUNE
+IMAGE_SIZE = (256, 256)
+# The formats validate.py keeps, as file extensions.
+IMAGE_EXTS = tuple("." + ext for ext in _FORMATS)
+
+
+def list_files(data_dir, image_exts=IMAGE_EXTS):
+    """Return ``(paths, labels, class_names)`` for ``data_dir/<class>/<file>``.
+
+    Classes are the sorted subdirectory names, labelled ``0..n-1`` as in
+    ``image_dataset_from_directory``; files are sorted so the listing, and
+    therefore the split, does not depend on the filesystem's order.
+    """
+    class_names = sorted(entry.name for entry in os.scandir(data_dir) if entry.is_dir())
+    paths, labels = [], []
+    for label, class_name in enumerate(class_names):
+        class_dir = os.path.join(data_dir, class_name)
+        names = sorted(
+            name
+            for name in os.listdir(class_dir)
+            if os.path.splitext(name)[1].lower() in image_exts
+        )
+        paths.extend(os.path.join(class_dir, name) for name in names)
+        labels.extend([label] * len(names))
+    return paths, np.array(labels, np.int32), class_names
+
+
+def split_files(paths, labels, validation_split=0.2, seed=123):
+    """Shuffle the file list with ``seed`` and split off ``validation_split`` of it."""
+    order = np.random.default_rng(seed).permutation(len(paths))
+    val_size = int(round(len(paths) * validation_split))
+    paths = np.asarray(paths)[order]
+    labels = np.asarray(labels)[order]
+    return (
+        (paths[val_size:], labels[val_size:]),
+        (paths[:val_size], labels[:val_size]),
+    )
+
+
+def load_image(path, image_size=IMAGE_SIZE):
+    """Decode any supported image file to a resized ``uint8`` RGB tensor."""
+    image = tf.io.decode_image(
+        tf.io.read_file(path), channels=3, expand_animations=False
+    )
+    image = tf.image.resize(image, image_size)
+    return tf.cast(tf.clip_by_value(tf.round(image), 0, 255), tf.uint8)
+
+
+def scale(images, labels):
+    return tf.cast(images, tf.float32) / 255.0, labels
+
+
+def build_dataset(
+    paths,
+    labels,
+    batch_size=32,
+    image_size=IMAGE_SIZE,
+    shuffle=False,
+    cache=None,
+    shuffle_buffer=1024,
+    seed=None,
+):
+    """Batched, prefetched ``(images, labels)`` dataset over ``paths``.
+
+    Without a cache the whole file list is reshuffled every epoch before
+    decoding, which is free. With a cache, decoded images are shuffled
+    through a ``shuffle_buffer``-sized window after it instead, since the
+    cache must see the same order each epoch.
+    """
+    ds = tf.data.Dataset.from_tensor_slices((paths, labels))
+    if shuffle and cache is None:
+        ds = ds.shuffle(len(paths), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.map(
+        lambda path, label: (load_image(path, image_size), label),
+        num_parallel_calls=AUTOTUNE,
+        deterministic=not shuffle,
+    )
+    if cache is not None:
+        ds = ds.cache(cache)
+        if shuffle:
+            ds = ds.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+    ds = ds.map(scale, num_parallel_calls=AUTOTUNE)
+    return ds.prefetch(AUTOTUNE)
+
+
+def make_datasets(
+    data_dir,
+    validation_split=0.2,
+    seed=123,
+    batch_size=32,
+    image_size=IMAGE_SIZE,
+    cache=None,
+):
+    """Return ``(train, val, class_names)`` built from a file-level split of ``data_dir``.
+
+    ``cache`` is ``None`` (decode every epoch), ``""`` (keep decoded images
+    in memory) or a file prefix; file caches get ``.train``/``.val``
+    suffixes. ``validation_split=0`` returns ``val`` as ``None``.
+    """
+    paths, labels, class_names = list_files(data_dir)
+    (train_paths, train_labels), (val_paths, val_labels) = split_files(
+        paths, labels, validation_split, seed
+    )
+
+    def cache_for(suffix):
+        return cache if not cache else "{}.{}".format(cache, suffix)
+
+    train = build_dataset(
+        train_paths,
+        train_labels,
+        batch_size,
+        image_size,
+        shuffle=True,
+        cache=cache_for("train"),
+        seed=seed,
+    )
+    val = None
+    if len(val_paths):
+        val = build_dataset(
+            val_paths,
+            val_labels,
+            batch_size,
+            image_size,
+            cache=cache_for("val"),
+        )
+    return train, val, class_names
@@ -0,0 +1,242 @@
+"""Preprocessed, sharded TFRecord copies of an image directory.
+
+Decoding and resizing JPEGs is most of the input cost, and even with
+``pipeline``'s cache it is paid again by every new process. ``convert``
+pays it once per version of the source directory. It writes the resized
+uint8 pixels and labels into TFRecord shards of ``images_per_shard``
+records each, plus an ``index.json`` that lists the shards and their
+record counts, the image size, the class names and a fingerprint of the
+source files. Calling it again is a no-op until a source file is added,
+removed or modified.
+
+``load_shards`` streams the shards back with ``interleave``, reading
+several files concurrently in large sequential reads. It parses whole
+batches at once rather than one record at a time.
+
+Convert from the command line::
+
+    python shards.py train shards/train --validation-split 0.2
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+import tensorflow as tf
+
+from pipeline import AUTOTUNE, IMAGE_SIZE, list_files, load_image, scale, split_files
+
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+IMAGES_PER_SHARD = 1024
+
+_FEATURES = {
+    "image": tf.io.FixedLenFeature([], tf.string),
+    "label": tf.io.FixedLenFeature([], tf.int64),
+}
+
+
+def fingerprint(paths):
+    """Hash of the paths, sizes and mtimes of ``paths``; changes with any file."""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        stat = os.stat(path)
+        digest.update(
+            "{}\0{}\0{}\n".format(path, stat.st_size, stat.st_mtime_ns).encode()
+        )
+    return digest.hexdigest()
+
+
+def read_index(out_dir):
+    path = os.path.join(out_dir, INDEX_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        index = json.load(f)
+    if index.get("version") != INDEX_VERSION:
+        return None
+    return index
+
+
+def _example(image, label):
+    return tf.train.Example(
+        features=tf.train.Features(
+            feature={
+                "image": tf.train.Feature(bytes_list=tf.train.BytesList(value=[image])),
+                "label": tf.train.Feature(int64_list=tf.train.Int64List(value=[label])),
+            }
+        )
+    ).SerializeToString()
+
+
+def write_shards(
+    paths,
+    labels,
+    out_dir,
+    prefix,
+    image_size=IMAGE_SIZE,
+    images_per_shard=IMAGES_PER_SHARD,
+):
+    """Decode ``paths`` in parallel and write them as shards; returns the shard list."""
+    ds = tf.data.Dataset.from_tensor_slices((paths, labels)).map(
+        lambda path, label: (load_image(path, image_size), label),
+        num_parallel_calls=AUTOTUNE,
+    )
+    ds = ds.prefetch(AUTOTUNE)
+    num_shards = max(1, -(-len(paths) // images_per_shard))
+    shards = []
+    writer = None
+    for i, (image, label) in enumerate(ds.as_numpy_iterator()):
+        if i % images_per_shard == 0:
+            if writer is not None:
+                writer.close()
+            name = "{}-{:05d}-of-{:05d}.tfrecord".format(
+                prefix, len(shards), num_shards
+            )
+            writer = tf.io.TFRecordWriter(os.path.join(out_dir, name))
+            shards.append({"path": name, "count": 0})
+        writer.write(_example(image.tobytes(), int(label)))
+        shards[-1]["count"] += 1
+    if writer is not None:
+        writer.close()
+    return shards
+
+
+def convert(
+    data_dir,
+    out_dir,
+    validation_split=0.0,
+    seed=123,
+    image_size=IMAGE_SIZE,
+    images_per_shard=IMAGES_PER_SHARD,
+):
+    """Write ``data_dir`` as TFRecord shards under ``out_dir``; returns the index.
+
+    With ``validation_split`` the file list is split as in
+    ``pipeline.make_datasets`` and written as separate ``train`` and
+    ``val`` shard sets; otherwise everything goes to ``train``. An existing
+    index with the same fingerprint and settings is returned unchanged.
+    """
+    paths, labels, class_names = list_files(data_dir)
+    settings = {
+        "source_fingerprint": fingerprint(paths),
+        "image_size": list(image_size),
+        "validation_split": validation_split,
+        "seed": seed,
+    }
+    index = read_index(out_dir)
+    if index is not None and all(index.get(k) == v for k, v in settings.items()):
+        return index
+
+    os.makedirs(out_dir, exist_ok=True)
+    index_path = os.path.join(out_dir, INDEX_NAME)
+    if os.path.exists(index_path):
+        os.remove(index_path)  # invalidate before overwriting any shards
+    for name in os.listdir(out_dir):
+        if name.endswith(".tfrecord"):
+            os.remove(os.path.join(out_dir, name))
+
+    (train_paths, train_labels), (val_paths, val_labels) = split_files(
+        paths, labels, validation_split, seed
+    )
+    splits = {}
+    for split, split_paths, split_labels in (
+        ("train", train_paths, train_labels),
+        ("val", val_paths, val_labels),
+    ):
+        if len(split_paths):
+            splits[split] = write_shards(
+                split_paths, split_labels, out_dir, split, image_size, images_per_shard
+            )
+
+    index = dict(
+        settings, version=INDEX_VERSION, class_names=class_names, splits=splits
+    )
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, index_path)
+    return index
+
+
+def load_shards(
+    out_dir,
+    split="train",
+    batch_size=32,
+    shuffle=None,
+    shuffle_buffer=1024,
+    seed=None,
+    cycle_length=4,
+):
+    """Batched ``(images, labels)`` dataset read back from ``convert``'s shards.
+
+    ``shuffle`` defaults to ``True`` for ``"train"``; it shuffles the shard
+    order and then records through ``shuffle_buffer``. ``cycle_length``
+    shards are read concurrently. With a ``seed`` the order is reproducible,
+    so the same seed gives the same batches; ``train.fit_resumable`` relies
+    on that to resume mid-epoch.
+    """
+    index = read_index(out_dir)
+    if index is None:
+        raise FileNotFoundError("no shard index in {}".format(out_dir))
+    if split not in index["splits"]:
+        raise ValueError("{} has no {!r} split".format(out_dir, split))
+    if shuffle is None:
+        shuffle = split == "train"
+    height, width = index["image_size"]
+    shard_paths = [os.path.join(out_dir, s["path"]) for s in index["splits"][split]]
+
+    def parse(records):
+        features = tf.io.parse_example(records, _FEATURES)
+        images = tf.io.decode_raw(features["image"], tf.uint8)
+        images = tf.reshape(images, (-1, height, width, 3))
+        return images, tf.cast(features["label"], tf.int32)
+
+    files = tf.data.Dataset.from_tensor_slices(shard_paths)
+    if shuffle:
+        files = files.shuffle(
+            len(shard_paths), seed=seed, reshuffle_each_iteration=True
+        )
+    ds = files.interleave(
+        lambda path: tf.data.TFRecordDataset(path, buffer_size=8 << 20),
+        cycle_length=min(cycle_length, len(shard_paths)),
+        num_parallel_calls=AUTOTUNE,
+        deterministic=not shuffle or seed is not None,
+    )
+    if shuffle:
+        ds = ds.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    # Interleaving hides the record count from tf.data; restore it so len()
+    # and Keras progress bars work.
+    count = sum(s["count"] for s in index["splits"][split])
+    ds = ds.apply(tf.data.experimental.assert_cardinality(count))
+    ds = ds.batch(batch_size).map(parse, num_parallel_calls=AUTOTUNE)
+    ds = ds.map(scale, num_parallel_calls=AUTOTUNE)
+    return ds.prefetch(AUTOTUNE)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("data_dir")
+    parser.add_argument("out_dir")
+    parser.add_argument("--validation-split", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=123)
+    parser.add_argument("--images-per-shard", type=int, default=IMAGES_PER_SHARD)
+    args = parser.parse_args(argv)
+    index = convert(
+        args.data_dir,
+        args.out_dir,
+        args.validation_split,
+        args.seed,
+        images_per_shard=args.images_per_shard,
+    )
+    for split, shards in index["splits"].items():
+        print(
+            "{}: {} images in {} shards".format(
+                split, sum(s["count"] for s in shards), len(shards)
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
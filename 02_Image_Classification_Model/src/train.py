@@ -0,0 +1,207 @@
+"""Resumable training with periodic, asynchronous checkpoints.
+
+``model.fit`` keeps all progress in memory, so a preempted job starts over.
+``fit_resumable`` runs the same epochs with its own compiled train step,
+using the model's loss and optimizer. Every ``save_every`` steps, and at
+the end of every epoch, it checkpoints the weights, the optimizer state,
+the epoch and step counters and the running epoch metrics. On start it
+restores the latest checkpoint in ``checkpoint_dir``, so rerunning the
+same command continues mid-epoch with the very next batch. The per-epoch metrics so far are kept next to the
+checkpoints in ``history.json``, so the returned history always starts at
+epoch 1.
+
+Checkpoints are written with TensorFlow's async checkpointing. Training
+only waits for the variables to be copied, not for the file I/O. On
+SIGTERM, which preemptible nodes send before shutdown, the current step
+finishes, a final checkpoint is written synchronously and the function
+returns with ``history["preempted"]`` set.
+
+The input is best passed as a function of the epoch number that returns
+the same batches for the same epoch, such as ``shards.load_shards`` with
+``seed=seed + epoch``. The checkpoint then holds no input state at all:
+resuming rebuilds the epoch's dataset and skips the batches already
+trained on. A plain ``tf.data.Dataset`` works too, but then the iterator
+is checkpointed, including the elements it has buffered. A 1024-image
+shuffle buffer of 256x256 images adds about 200 MB to every checkpoint and
+makes each save block training while it is copied.
+``symbolic_checkpoint=True`` stores positions only, but ``tf.data`` rejects
+it for some transformations, including ``shards.load_shards``' parallel
+interleave.
+"""
+
+import json
+import os
+import signal
+
+import tensorflow as tf
+
+HISTORY_NAME = "history.json"
+
+
+def _tf_variable(variable):
+    # Keras 3 wraps each tf.Variable; its async-checkpoint hook breaks on the
+    # second save, so the checkpoint tracks the wrapped variables directly.
+    value = getattr(variable, "value", None)
+    return value if isinstance(value, tf.Variable) else variable
+
+
+def _load_history(checkpoint_dir, epochs_done):
+    path = os.path.join(checkpoint_dir, HISTORY_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        history = json.load(f)
+    # The file is written before the epoch's checkpoint, so it may be one
+    # epoch ahead of it; that epoch is about to be rerun.
+    return {name: values[:epochs_done] for name, values in history.items()}
+
+
+def _save_history(checkpoint_dir, history):
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    path = os.path.join(checkpoint_dir, HISTORY_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(history, f)
+    os.replace(tmp_path, path)
+
+
+def fit_resumable(
+    model,
+    dataset,
+    epochs,
+    checkpoint_dir,
+    validation_data=None,
+    save_every=100,
+    max_to_keep=3,
+    log_dir=None,
+    symbolic_checkpoint=False,
+    verbose=True,
+):
+    """Train a compiled binary classifier for ``epochs``, resuming from ``checkpoint_dir``.
+
+    ``dataset`` is either a function ``epoch -> tf.data.Dataset`` that is
+    deterministic per epoch, or a dataset that is repeated internally so
+    one checkpointed iterator spans all epochs. Either way the dataset must
+    have a known length (``len(dataset)``). Returns a ``fit``-style
+    history dict of per-epoch metrics for every completed epoch, including
+    those run before a restart.
+    """
+    make_dataset = dataset if callable(dataset) else None
+    steps_per_epoch = len(make_dataset(0) if make_dataset else dataset)
+    loss_fn = tf.keras.losses.get(model.loss)
+    # Running sums of the epoch metrics, kept as plain variables so they are
+    # checkpointed with everything else.
+    totals = {
+        name: tf.Variable(0.0, dtype=tf.float64, trainable=False)
+        for name in ("loss", "correct", "samples")
+    }
+
+    @tf.function
+    def train_step(x, y):
+        with tf.GradientTape() as tape:
+            predictions = model(x, training=True)
+            labels = tf.reshape(tf.cast(y, predictions.dtype), tf.shape(predictions))
+            loss = tf.reduce_mean(loss_fn(labels, predictions))
+        variables = model.trainable_variables
+        gradients = tape.gradient(loss, variables)
+        model.optimizer.apply_gradients(zip(gradients, variables))
+        batch_size = tf.cast(tf.shape(y)[0], tf.float64)
+        predicted = tf.reshape(predictions, [-1]) > 0.5
+        actual = tf.reshape(y, [-1]) > 0
+        totals["loss"].assign_add(tf.cast(loss, tf.float64) * batch_size)
+        totals["correct"].assign_add(
+            tf.reduce_sum(tf.cast(predicted == actual, tf.float64))
+        )
+        totals["samples"].assign_add(batch_size)
+
+    epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+    step = tf.Variable(0, dtype=tf.int64, trainable=False)
+    state = {}
+    if make_dataset is None:
+        dataset = dataset.repeat()
+        if symbolic_checkpoint:
+            options = tf.data.Options()
+            options.experimental_symbolic_checkpoint = True
+            dataset = dataset.with_options(options)
+        iterator = state["iterator"] = iter(dataset)
+    if not model.optimizer.built:
+        model.optimizer.build(model.trainable_variables)
+    checkpoint = tf.train.Checkpoint(
+        weights=[_tf_variable(v) for v in model.weights],
+        optimizer=[_tf_variable(v) for v in model.optimizer.variables],
+        epoch=epoch,
+        step=step,
+        totals=totals,
+        **state,
+    )
+    manager = tf.train.CheckpointManager(checkpoint, checkpoint_dir, max_to_keep)
+    async_options = tf.train.CheckpointOptions(
+        experimental_enable_async_checkpoint=True
+    )
+    if manager.latest_checkpoint:
+        checkpoint.restore(manager.latest_checkpoint).assert_existing_objects_matched()
+        if verbose:
+            print(
+                "Resuming from {} at epoch {}, step {}".format(
+                    manager.latest_checkpoint, int(epoch) + 1, int(step)
+                )
+            )
+
+    preempted = []
+    previous_handler = signal.signal(
+        signal.SIGTERM, lambda signum, frame: preempted.append(signum)
+    )
+    writer = tf.summary.create_file_writer(log_dir) if log_dir else None
+    metrics = _load_history(checkpoint_dir, int(epoch))
+    history = dict(metrics, preempted=False)
+    try:
+        while int(epoch) < epochs:
+            if int(step) == 0:
+                for total in totals.values():
+                    total.assign(0.0)
+            if make_dataset is not None:
+                iterator = iter(make_dataset(int(epoch)).skip(int(step)))
+            while int(step) < steps_per_epoch:
+                train_step(*next(iterator))
+                step.assign_add(1)
+                if preempted:
+                    manager.save()  # synchronous: the node is about to go away
+                    manager.sync()
+                    history["preempted"] = True
+                    return history
+                if int(step) % save_every == 0 and int(step) < steps_per_epoch:
+                    manager.save(options=async_options)
+
+            samples = float(totals["samples"])
+            logs = {
+                "loss": float(totals["loss"]) / samples,
+                "accuracy": float(totals["correct"]) / samples,
+            }
+            if validation_data is not None:
+                val_logs = model.evaluate(validation_data, verbose=0, return_dict=True)
+                logs.update(("val_" + k, float(v)) for k, v in val_logs.items())
+            for name, value in logs.items():
+                metrics.setdefault(name, []).append(value)
+                history[name] = metrics[name]
+            if writer is not None:
+                with writer.as_default(step=int(epoch)):
+                    for name, value in logs.items():
+                        tf.summary.scalar("epoch_" + name, value)
+            if verbose:
+                print(
+                    "Epoch {}/{} - {}".format(
+                        int(epoch) + 1,
+                        epochs,
+                        " - ".join("{}: {:.4f}".format(k, v) for k, v in logs.items()),
+                    )
+                )
+            epoch.assign_add(1)
+            step.assign(0)
+            _save_history(checkpoint_dir, metrics)
+            manager.save(options=async_options)
+        manager.sync()
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
+        if writer is not None:
+            writer.close()
+    return history